@@ -0,0 +1,74 @@
+"""
+TTL cache for async lookups that only remembers successful results.
+
+The crawlers and MSRP lookup report failures (timeouts, 429s, network
+errors) as None / [], the same as "not found". Caching those would turn
+one transient failure into minutes of misses, so empty results are never
+stored and the next call tries again.
+"""
+
+import asyncio
+import copy
+import functools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Coroutine, Dict, Hashable, ParamSpec, Tuple, TypeVar
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def cache_successes(
+    maxsize: int, ttl: float
+) -> Callable[
+    [Callable[P, Coroutine[Any, Any, T]]], Callable[P, Coroutine[Any, Any, T]]
+]:
+    """
+    Cache an async function's truthy results for `ttl` seconds (LRU-bounded).
+
+    Arguments must be hashable (methods are keyed on `self` too).
+    Concurrent calls with the same arguments share one in-flight call.
+    Callers get a shallow copy, so mutating a returned list doesn't change
+    what later callers see.
+    """
+
+    def decorator(
+        fn: Callable[P, Coroutine[Any, Any, T]]
+    ) -> Callable[P, Coroutine[Any, Any, T]]:
+        entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+        in_flight: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+        def store(key: Hashable, task: "asyncio.Future[T]") -> None:
+            in_flight.pop(key, None)
+            if task.cancelled() or task.exception() is not None:
+                return
+            result = task.result()
+            if result:
+                entries[key] = (time.monotonic() + ttl, result)
+                entries.move_to_end(key)
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            key: Hashable = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            entry = entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    entries.move_to_end(key)
+                    return copy.copy(entry[1])
+                del entries[key]
+
+            task = in_flight.get(key)
+            if task is None:
+                task = in_flight[key] = asyncio.ensure_future(fn(*args, **kwargs))
+                task.add_done_callback(functools.partial(store, key))
+
+            # Shielded so one caller timing out doesn't cancel the call for
+            # the others sharing it
+            return copy.copy(await asyncio.shield(task))
+
+        return wrapper
+
+    return decorator
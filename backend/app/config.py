@@ -2,7 +2,8 @@
 Application settings loaded from environment variables.
 """
 
-from typing import List
+from functools import cached_property
+from typing import Tuple
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -20,10 +21,22 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins into a list."""
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
+    # Max in-flight image lookups per retailer host (ImageFetcher)
+    SEPHORA_CONCURRENCY: int = 6
+    GOOGLE_IMAGES_CONCURRENCY: int = 4
+
+    # Max in-flight requests per host across all outbound clients (app.http_pool)
+    HTTP_PER_HOST_CONCURRENCY: int = 10
+
+    # /api/enrich/batch: max products per request, and how many of a
+    # batch's cache misses are crawled at once
+    BATCH_MAX_SIZE: int = 100
+    BATCH_CRAWL_CONCURRENCY: int = 4
+
+    @cached_property
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        """Parse CORS origins once (settings are immutable after startup)."""
+        return tuple(origin.strip() for origin in self.CORS_ORIGINS.split(","))
 
     model_config = SettingsConfigDict(
         env_file=".env", case_sensitive=True, extra="ignore"
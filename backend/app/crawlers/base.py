@@ -3,18 +3,54 @@ Base crawler class for web scraping.
 """
 import httpx
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List
-from urllib.parse import urlparse, quote
-from bs4 import BeautifulSoup
+from typing import Collection, Optional, Dict, Any, List, Tuple
+from urllib.parse import urlparse
 import asyncio
+import logging
 import random
+import re
 
+from app.http_pool import shared_transport
 from app.rate_limiter import rate_limiter
 
 
+log = logging.getLogger(__name__)
+
+USER_AGENTS = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+)
+
+# Host part of an absolute URL ("https://www.google.com/search?..." -> "www.google.com")
+_HOST_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*://([^/?#]*)")
+
+# Built once at import; each crawler only adds its User-Agent on top
+_DEFAULT_HEADERS: Dict[str, str] = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
 class CrawlResult:
     """Result from crawling a product page."""
     
+    # Created per parsed card/page, so skip the per-instance __dict__
+    __slots__ = (
+        'source',
+        'url',
+        'found_upc',
+        'upc',
+        'title',
+        'price',
+        'image_url',
+        'description',
+        'source_key',
+    )
+    
     def __init__(
         self,
         source: str,
@@ -34,6 +70,8 @@ class CrawlResult:
         self.price = price
         self.image_url = image_url
         self.description = description
+        # Source without the "(seller)" suffix, used to dedupe results
+        self.source_key = source.partition("(")[0].rstrip()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -47,67 +85,96 @@ class CrawlResult:
             'image_url': self.image_url,
             'description': self.description,
         }
+    
+    def to_source(self) -> Dict[str, Any]:
+        """Convert to the source entry reported in API responses."""
+        return {
+            'name': self.source,
+            'url': self.url,
+            'found_upc': self.found_upc,
+        }
 
 
 class BaseCrawler(ABC):
     """Base class for all crawlers."""
     
+    # Random pre-request delay in seconds (human-like behavior). Off by
+    # default; crawlers hitting bot-detecting sites opt in.
+    JITTER_RANGE: Tuple[float, float] = (0.0, 0.0)
+    
     def __init__(self, source_name: str) -> None:
         self.source_name = source_name
+        # HTTP/2 multiplexes parallel searches to the same host over one
+        # connection; the pool is shared with the other crawlers and the
+        # image/MSRP lookups (see app.http_pool)
         self.client = httpx.AsyncClient(
             timeout=30.0,
             follow_redirects=True,
-            headers=self._get_default_headers()
+            headers=self._get_default_headers(),
+            transport=shared_transport(),
         )
     
     def _get_default_headers(self) -> Dict[str, str]:
-        """Get default HTTP headers."""
-        user_agents = [
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        ]
+        """
+        Get default HTTP headers.
         
-        return {
-            "User-Agent": random.choice(user_agents),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
+        Called once per crawler: the User-Agent stays fixed for the
+        client's lifetime so pooled connections look like one browser.
+        """
+        return {"User-Agent": random.choice(USER_AGENTS), **_DEFAULT_HEADERS}
     
-    async def fetch(self, url: str) -> Optional[str]:
+    async def fetch(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        miss_statuses: Collection[int] = (),
+    ) -> Optional[bytes]:
         """
         Fetch URL with rate limiting and error handling.
         
-        Returns HTML content or None if fetch failed.
-        """
-        domain = urlparse(url).netloc
-        limiter = rate_limiter.get_limiter(domain)
+        Returns the raw response body or None if fetch failed. Bytes are
+        returned as-is: the HTML and JSON parsers decode them natively, so
+        there's no need to materialize a str first.
         
-        await limiter.acquire()
+        timeout overrides the client's 30s default for this request.
+        miss_statuses are non-200 codes the endpoint uses for an ordinary
+        "not found" (e.g. 404 from a lookup API); they return None without
+        a warning.
+        """
+        # Every URL is distinct (query strings), so caching urlparse results
+        # wouldn't hit; a single anchored regex match is cheaper than the split
+        host_match = _HOST_RE.match(url)
+        domain = host_match.group(1) if host_match else urlparse(url).netloc
         
-        try:
-            # Random jitter (human-like behavior)
-            await asyncio.sleep(random.uniform(0.1, 0.3))
-            
-            response = await self.client.get(url, headers=self._get_default_headers())
-            
-            if response.status_code == 200:
-                return response.text
-            else:
-                print(f"[{self.source_name}] HTTP {response.status_code} for {url}")
-                return None
+        # The limiter is the one in-flight cap per domain: it paces requests
+        # and holds one of RateLimitConfig.max_concurrent slots (at most 2
+        # today) for the whole request, bounding how many HTTP/2 streams a
+        # burst can open on one host
+        async with rate_limiter.get_limiter(domain):
+            try:
+                if self.JITTER_RANGE[1] > 0:
+                    await asyncio.sleep(random.uniform(*self.JITTER_RANGE))
                 
-        except httpx.TimeoutException:
-            print(f"[{self.source_name}] Timeout fetching {url}")
-            return None
-        except Exception as e:
-            print(f"[{self.source_name}] Error fetching {url}: {e}")
-            return None
-        finally:
-            limiter.release()
+                response = await self.client.get(
+                    url,
+                    timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+                )
+                
+                if response.status_code == 200:
+                    return response.content
+                elif response.status_code in miss_statuses:
+                    log.debug("[%s] HTTP %s (not found) for %s", self.source_name, response.status_code, url)
+                    return None
+                else:
+                    log.warning("[%s] HTTP %s for %s", self.source_name, response.status_code, url)
+                    return None
+                    
+            except httpx.TimeoutException:
+                log.warning("[%s] Timeout fetching %s", self.source_name, url)
+                return None
+            except Exception as e:
+                log.warning("[%s] Error fetching %s: %s", self.source_name, url, e)
+                return None
     
     @abstractmethod
     async def search_by_upc(self, upc: str) -> List[CrawlResult]:
@@ -119,7 +186,7 @@ class BaseCrawler(ABC):
         pass
     
     @abstractmethod
-    def parse_product_page(self, html: str, url: str) -> Optional[CrawlResult]:
+    def parse_product_page(self, html: str | bytes, url: str) -> Optional[CrawlResult]:
         """
         Parse product page HTML.
         
@@ -8,16 +8,43 @@ Google Shopping is more reliable than retailer sites because:
 """
 import re
 import json
-from typing import List, Optional
+import logging
+from collections import Counter
+from typing import List, Optional, Tuple
 from urllib.parse import quote
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser, Node
 
 from app.crawlers.base import BaseCrawler, CrawlResult
 
 
+log = logging.getLogger(__name__)
+
+_PRICE_RE = re.compile(r'\$(\d+(?:\.\d{2})?)')
+_SEARCH_URL = "https://www.google.com/search?tbm=shop&q={}"
+
+# Selectors tried in order; the first one that matches wins.
+# Google Shopping uses various div structures, the last is a catch-all.
+_CARD_SELECTORS = ('div.sh-dgr__content', 'div.sh-dlr__list-result', 'div[class*="sh-"]')
+_TITLE_SELECTORS = ('h3', 'h4', 'a')
+_PRICE_SELECTORS = ('span.a8Pemb', 'span.kHxwFf')
+_SELLER_SELECTORS = ('div.aULzUe', 'div.E5ocAb')
+_FALLBACK_IMG_SELECTORS = ('img[src*="encrypted"]', 'img[src*="gstatic"]')
+
+
+def _first_match(node: Node | HTMLParser, selectors: Tuple[str, ...]) -> Optional[Node]:
+    """Return the first node matched by the earliest matching selector."""
+    for selector in selectors:
+        match = node.css_first(selector)
+        if match is not None:
+            return match
+    return None
+
+
 class GoogleShoppingCrawler(BaseCrawler):
     """Crawler for Google Shopping."""
     
+    JITTER_RANGE = (0.1, 0.3)
+    
     def __init__(self) -> None:
         super().__init__("google_shopping")
     
@@ -44,7 +71,7 @@ class GoogleShoppingCrawler(BaseCrawler):
     async def _search(self, query: str) -> List[CrawlResult]:
         """Perform Google Shopping search."""
         
-        url = f"https://www.google.com/search?tbm=shop&q={quote(query)}"
+        url = _SEARCH_URL.format(quote(query))
         
         html = await self.fetch(url)
         if not html:
@@ -52,25 +79,17 @@ class GoogleShoppingCrawler(BaseCrawler):
         
         return self._parse_shopping_results(html, query)
     
-    def _parse_shopping_results(self, html: str, query: str) -> List[CrawlResult]:
+    def _parse_shopping_results(self, html: str | bytes, query: str) -> List[CrawlResult]:
         """Parse Google Shopping search results."""
         
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = HTMLParser(html)
         results: List[CrawlResult] = []
         
-        # Google Shopping uses various div structures
-        # Try multiple selectors
-        
-        # Method 1: Look for product cards with prices
-        product_cards = soup.select('div.sh-dgr__content')
-        
-        if not product_cards:
-            # Method 2: Alternative selector
-            product_cards = soup.select('div.sh-dlr__list-result')
-        
-        if not product_cards:
-            # Method 3: Look for any div with price pattern
-            product_cards = soup.find_all('div', class_=lambda x: x and 'sh-' in x)
+        product_cards: List[Node] = []
+        for selector in _CARD_SELECTORS:
+            product_cards = tree.css(selector)
+            if product_cards:
+                break
         
         for card in product_cards[:5]:  # Limit to top 5
             result = self._parse_product_card(card, query)
@@ -79,24 +98,30 @@ class GoogleShoppingCrawler(BaseCrawler):
         
         # If no structured results, try to extract any price/product info
         if not results:
-            result = self._fallback_extraction(soup, query)
+            result = self._fallback_extraction(tree, query)
             if result:
                 results.append(result)
         
         return results
     
-    def _parse_product_card(self, card: BeautifulSoup, query: str) -> Optional[CrawlResult]:
+    def _parse_product_card(self, card: Node, query: str) -> Optional[CrawlResult]:
         """Parse a single product card from Google Shopping."""
         
         try:
             # Extract title
-            title_elem = card.select_one('h3') or card.select_one('h4') or card.select_one('a')
-            title = title_elem.text.strip() if title_elem else None
+            title_elem = _first_match(card, _TITLE_SELECTORS)
+            title = title_elem.text().strip() if title_elem else None
             
             # Extract price
+            # Scan the dedicated price node when present; only fall back to
+            # the text of the whole card when it's missing or has no price
             price = None
-            price_text = card.get_text()
-            price_match = re.search(r'\$(\d+(?:\.\d{2})?)', price_text)
+            price_match = None
+            price_elem = _first_match(card, _PRICE_SELECTORS)
+            if price_elem:
+                price_match = _PRICE_RE.search(price_elem.text())
+            if not price_match:
+                price_match = _PRICE_RE.search(card.text())
             if price_match:
                 try:
                     price = float(price_match.group(1))
@@ -105,15 +130,15 @@ class GoogleShoppingCrawler(BaseCrawler):
             
             # Extract image
             image_url = None
-            img_elem = card.select_one('img')
+            img_elem = card.css_first('img')
             if img_elem:
-                image_url = img_elem.get('src') or img_elem.get('data-src')
+                image_url = img_elem.attributes.get('src') or img_elem.attributes.get('data-src')
             
             # Extract link
             url = None
-            link_elem = card.select_one('a[href]')
+            link_elem = card.css_first('a[href]')
             if link_elem:
-                href = link_elem.get('href', '')
+                href = link_elem.attributes.get('href') or ''
                 if href.startswith('/'):
                     url = f"https://www.google.com{href}"
                 elif href.startswith('http'):
@@ -121,14 +146,14 @@ class GoogleShoppingCrawler(BaseCrawler):
             
             # Extract seller/source
             seller = None
-            seller_elem = card.select_one('div.aULzUe') or card.select_one('div.E5ocAb')
+            seller_elem = _first_match(card, _SELLER_SELECTORS)
             if seller_elem:
-                seller = seller_elem.text.strip()
+                seller = seller_elem.text().strip()
             
             if title or price:
                 return CrawlResult(
                     source=f"google_shopping ({seller})" if seller else "google_shopping",
-                    url=url or f"https://www.google.com/search?tbm=shop&q={quote(query)}",
+                    url=url or _SEARCH_URL.format(quote(query)),
                     found_upc=False,  # Google doesn't expose UPC directly
                     upc=None,
                     title=title,
@@ -138,36 +163,32 @@ class GoogleShoppingCrawler(BaseCrawler):
                 )
             
         except Exception as e:
-            print(f"[google_shopping] Error parsing card: {e}")
+            log.warning("[google_shopping] Error parsing card: %s", e)
         
         return None
     
-    def _fallback_extraction(self, soup: BeautifulSoup, query: str) -> Optional[CrawlResult]:
+    def _fallback_extraction(self, tree: HTMLParser, query: str) -> Optional[CrawlResult]:
         """
         Fallback extraction when structured parsing fails.
         
         Just try to find any price on the page.
         """
-        page_text = soup.get_text()
+        page_text = tree.body.text(separator=' ', strip=True) if tree.body else ''
         
         # Find all prices
-        prices = re.findall(r'\$(\d+(?:\.\d{2})?)', page_text)
+        prices = _PRICE_RE.findall(page_text)
         
         if prices:
             # Take the most common price (likely MSRP)
-            price_counts = {}
-            for p in prices:
-                price_counts[p] = price_counts.get(p, 0) + 1
-            
-            most_common_price = max(price_counts, key=price_counts.get)
+            most_common_price, _ = Counter(prices).most_common(1)[0]
             
             # Find any image
-            img = soup.select_one('img[src*="encrypted"]') or soup.select_one('img[src*="gstatic"]')
-            image_url = img.get('src') if img else None
+            img = _first_match(tree, _FALLBACK_IMG_SELECTORS)
+            image_url = img.attributes.get('src') if img else None
             
             return CrawlResult(
                 source="google_shopping",
-                url=f"https://www.google.com/search?tbm=shop&q={quote(query)}",
+                url=_SEARCH_URL.format(quote(query)),
                 found_upc=False,
                 upc=None,
                 title=query,  # Use query as title
@@ -178,6 +199,6 @@ class GoogleShoppingCrawler(BaseCrawler):
         
         return None
     
-    def parse_product_page(self, html: str, url: str) -> Optional[CrawlResult]:
+    def parse_product_page(self, html: str | bytes, url: str) -> Optional[CrawlResult]:
         """Not used for Google Shopping (we parse search results directly)."""
         return None
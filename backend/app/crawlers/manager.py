@@ -3,15 +3,25 @@ Crawler manager - orchestrates multiple crawlers.
 """
 
 import asyncio
-from typing import List, Dict, Any, Optional
+import heapq
+import logging
+import statistics
+from typing import List, Dict, Any, Coroutine, Optional, Set, Tuple
 
 from app.crawlers.base import CrawlResult
 from app.crawlers.sephora import SephoraCrawler
 from app.crawlers.google_shopping import GoogleShoppingCrawler
 from app.crawlers.upc_database import UPCDatabaseCrawler
+from app.upc_validate import is_valid_upc
 from app.verification import product_verifier, VerificationResult
 
 
+log = logging.getLogger(__name__)
+
+# Upper bound on a single crawler search (seconds)
+CRAWLER_TIMEOUT = 30.0
+
+
 class CrawlerManager:
     """Manages multiple crawlers and orchestrates searches."""
 
@@ -35,92 +45,113 @@ class CrawlerManager:
 
         Strategy:
         1. Search by UPC across all sources
-        2. ALSO search by brand+name (in parallel)
+        2. ALSO search by brand+name (same gather as step 1)
         3. Combine and deduplicate results
 
         Returns combined results from all sources.
         """
-        print(f"[CrawlerManager] Starting search for UPC: {upc}")
+        log.debug("[CrawlerManager] Starting search for UPC: %s", upc)
 
-        # Step 1: Try UPC search
-        upc_results = await self._search_by_upc(upc)
+        # Step 1: UPC search tasks
+        tasks = self._upc_search_tasks(upc)
+        upc_task_count = len(tasks)
 
-        # Step 2: ALSO try brand+name search (more likely to find results)
-        name_results: List[CrawlResult] = []
+        # Step 2: ALSO brand+name search (more likely to find results)
         if brand and product_name:
-            print(
-                f"[CrawlerManager] Also searching by brand+name: {brand} {product_name}"
+            log.debug(
+                "[CrawlerManager] Also searching by brand+name: %s %s", brand, product_name
             )
-            name_results = await self._search_by_name(brand, product_name)
+            tasks += self._name_search_tasks(brand, product_name)
+
+        # One fan-out: latency is the slowest crawler, not UPC + name in series
+        per_task = await self._gather_results(tasks)
+        upc_results = [r for results in per_task[:upc_task_count] for r in results]
+        name_results = [r for results in per_task[upc_task_count:] for r in results]
 
         # Combine results (UPC results first - more authoritative)
         all_results = upc_results + name_results
 
         # Filter out duplicates (same source + similar price)
-        seen = set()
+        seen: Set[Tuple[str, Optional[float]]] = set()
         unique_results: List[CrawlResult] = []
         for r in all_results:
-            key = (
-                r.source.split("(")[0].strip(),
-                r.price,
-            )  # Dedupe by source and price
+            key = (r.source_key, r.price)  # Dedupe by source and price
             if key not in seen:
                 seen.add(key)
                 unique_results.append(r)
 
-        print(
-            f"[CrawlerManager] Total results: {len(unique_results)} (UPC: {len(upc_results)}, Name: {len(name_results)})"
+        log.debug(
+            "[CrawlerManager] Total results: %d (UPC: %d, Name: %d)",
+            len(unique_results),
+            len(upc_results),
+            len(name_results),
         )
         return unique_results
 
-    async def _search_by_upc(self, upc: str) -> List[CrawlResult]:
-        """Search all crawlers by UPC."""
+    def _upc_search_tasks(
+        self, upc: str
+    ) -> List[Coroutine[Any, Any, List[CrawlResult]]]:
+        """
+        Build search-by-UPC coroutines for all crawlers.
+
+        A UPC with a bad check digit (typo, truncated code) can't match
+        anything, so no UPC searches are issued for it.
+        """
+        if not is_valid_upc(upc):
+            log.debug("[CrawlerManager] Invalid UPC check digit, skipping UPC search: %s", upc)
+            return []
 
-        tasks = [
+        return [
             self.sephora.search_by_upc(upc),
             self.google_shopping.search_by_upc(upc),
             self.upc_database.search_by_upc(upc),
         ]
 
-        return await self._gather_results(tasks)
-
-    async def _search_by_name(self, brand: str, product_name: str) -> List[CrawlResult]:
-        """Search by brand + product name."""
+    def _name_search_tasks(
+        self, brand: str, product_name: str
+    ) -> List[Coroutine[Any, Any, List[CrawlResult]]]:
+        """Build search-by-brand+name coroutines."""
 
         # Extract just the core product name (remove size, color, etc.)
         # "No Pressure Lip Liner - #1 - On the Rose" -> "No Pressure Lip Liner"
-        core_name = product_name.split("-")[0].strip()
-        core_name = core_name.split("/")[0].strip()
+        core_name = product_name.partition("-")[0].strip()
+        core_name = core_name.partition("/")[0].strip()
 
-        tasks = [
+        return [
             self.google_shopping.search_by_name(brand, core_name),
             self.google_shopping.search_by_name(brand, product_name),  # Full name too
         ]
 
-        return await self._gather_results(tasks)
+    async def _gather_results(
+        self, tasks: List[Coroutine[Any, Any, List[CrawlResult]]]
+    ) -> List[List[CrawlResult]]:
+        """
+        Gather results from multiple tasks with a per-task timeout.
 
-    async def _gather_results(self, tasks: list) -> List[CrawlResult]:
-        """Gather results from multiple tasks with timeout."""
+        Returns one result list per task, in task order. A slow or failing
+        crawler yields an empty list; the other crawlers' results are kept.
+        """
 
-        try:
-            results_list = await asyncio.wait_for(
-                asyncio.gather(*tasks, return_exceptions=True), timeout=30.0
-            )
-        except asyncio.TimeoutError:
-            print("[CrawlerManager] Timeout - using partial results")
-            return []
+        results_list = await asyncio.gather(
+            *(asyncio.wait_for(task, timeout=CRAWLER_TIMEOUT) for task in tasks),
+            return_exceptions=True,
+        )
 
-        # Flatten and filter
-        all_results: List[CrawlResult] = []
+        per_task: List[List[CrawlResult]] = []
         for results in results_list:
             if isinstance(results, list):
-                all_results.extend(results)
+                per_task.append(results)
                 for r in results:
-                    print(f"  [+] {r.source}: {r.title} - ${r.price}")
+                    log.debug("[+] %s: %s - $%s", r.source, r.title, r.price)
+                continue
+
+            per_task.append([])
+            if isinstance(results, asyncio.TimeoutError):
+                log.warning("[CrawlerManager] Crawler timed out - using partial results")
             elif isinstance(results, Exception):
-                print(f"  [!] Crawler error: {results}")
+                log.warning("[CrawlerManager] Crawler error: %s", results)
 
-        return all_results
+        return per_task
 
     async def close_all(self) -> None:
         """Close all crawler HTTP clients."""
@@ -144,11 +175,11 @@ def aggregate_crawl_results(
     - Size/volume matches (if provided)
     - Color/shade matches (if provided)
 
-    Strategy:
+    Strategy (one pass over the results):
     1. Filter out garbage results (no real content)
     2. Verify each result against input attributes
-    3. Only count verified matches
-    4. Return confidence based on verification quality
+    3. Bucket into exact / high-confidence / low-confidence matches
+    4. Return confidence based on the best non-empty bucket
     """
     # Normalize null strings
     input_size = None if input_size in (None, "null", "None", "") else input_size
@@ -165,44 +196,30 @@ def aggregate_crawl_results(
             "verification": None,
         }
 
-    # Filter out garbage results (title/description is just UPC or empty)
-    valid_results = []
-    for r in results:
-        title = (r.title or "").strip()
-        desc = (r.description or "").strip()
+    # Input attributes are the same for every result; extract them once
+    input_attrs = product_verifier.extract_input_attributes(
+        input_name, input_size, input_color
+    )
+
+    # Single pass: filter garbage, verify, and bucket by match quality
+    exact_matches: List[tuple[CrawlResult, VerificationResult]] = []
+    high_confidence: List[tuple[CrawlResult, VerificationResult]] = []
+    low_confidence: List[tuple[CrawlResult, VerificationResult]] = []
+
+    for result in results:
+        title = (result.title or "").strip()
+        desc = (result.description or "").strip()
 
         # Skip if title is just the UPC
         if title == input_upc or title == "":
-            print(f"  [Filter] Skipping {r.source}: title is empty or just UPC")
+            log.debug("[Filter] Skipping %s: title is empty or just UPC", result.source)
             continue
 
         # Skip if description is just the UPC and no real title
         if desc == input_upc and len(title) < 10:
-            print(f"  [Filter] Skipping {r.source}: no real content")
+            log.debug("[Filter] Skipping %s: no real content", result.source)
             continue
 
-        valid_results.append(r)
-
-    if not valid_results:
-        return {
-            "confidence": 0,
-            "reasoning": "No valid results found (only garbage data)",
-            "msrp": None,
-            "image_url": None,
-            "description": None,
-            "sources": [
-                {"name": r.source, "url": r.url, "found_upc": r.found_upc}
-                for r in results
-            ],
-            "verification": None,
-        }
-
-    results = valid_results
-
-    # Verify each result
-    verified_results: List[tuple[CrawlResult, VerificationResult]] = []
-
-    for result in results:
         verification = product_verifier.verify_match(
             input_brand=input_brand,
             input_name=input_name,
@@ -211,67 +228,66 @@ def aggregate_crawl_results(
             found_title=result.title,
             found_description=result.description,
             found_upc_match=result.found_upc,  # Pass UPC match status!
+            input_attrs=input_attrs,
         )
 
-        print(
-            f"  [Verify] {result.source}: match={verification.is_exact_match}, "
-            f"confidence={verification.confidence}, upc_match={result.found_upc}, mismatches={verification.mismatches}"
+        log.debug(
+            "[Verify] %s: match=%s, confidence=%s, upc_match=%s, mismatches=%s",
+            result.source,
+            verification.is_exact_match,
+            verification.confidence,
+            result.found_upc,
+            verification.mismatches,
         )
 
-        verified_results.append((result, verification))
-
-    # Sort by verification confidence
-    verified_results.sort(key=lambda x: x[1].confidence, reverse=True)
-
-    # Filter to exact matches only
-    exact_matches = [(r, v) for r, v in verified_results if v.is_exact_match]
-
-    # Also consider high-confidence near-matches (brand match + one attribute)
-    high_confidence = [(r, v) for r, v in verified_results if v.confidence >= 70]
+        if verification.is_exact_match:
+            exact_matches.append((result, verification))
+        elif verification.confidence >= 70:
+            high_confidence.append((result, verification))
+        else:
+            low_confidence.append((result, verification))
 
     if exact_matches:
         # HIGH CONFIDENCE: We have verified exact matches
+        exact_matches.sort(key=lambda x: x[1].confidence, reverse=True)
         return _aggregate_verified_results(exact_matches, input_upc, is_exact=True)
 
     elif high_confidence:
         # MEDIUM CONFIDENCE: Brand matches, some attributes verified
+        high_confidence.sort(key=lambda x: x[1].confidence, reverse=True)
         return _aggregate_verified_results(high_confidence, input_upc, is_exact=False)
 
-    elif verified_results:
+    elif low_confidence:
         # LOW CONFIDENCE: Results found but verification failed
-        best_result, best_verification = verified_results[0]
+        best_result, best_verification = max(
+            low_confidence, key=lambda x: x[1].confidence
+        )
         return {
             "confidence": best_verification.confidence,
             "reasoning": f"VERIFICATION FAILED: {best_verification.reasoning}",
             "msrp": best_result.price,
             "image_url": best_result.image_url,
             "description": best_result.description or best_result.title,
-            "sources": [
-                {
-                    "name": best_result.source,
-                    "url": best_result.url,
-                    "found_upc": best_result.found_upc,
-                }
-            ],
+            "sources": [best_result.to_source()],
             "verification": {
                 "is_exact_match": False,
                 "brand_match": best_verification.brand_match,
                 "size_match": best_verification.size_match,
                 "color_match": best_verification.color_match,
-                "mismatches": best_verification.mismatches,
+                "mismatches": list(best_verification.mismatches),
             },
         }
 
-    else:
-        return {
-            "confidence": 0,
-            "reasoning": "No results found from any source",
-            "msrp": None,
-            "image_url": None,
-            "description": None,
-            "sources": [],
-            "verification": None,
-        }
+    # Every result was filtered out as garbage
+    return {
+        "confidence": 0,
+        "reasoning": "No valid results found (only garbage data)",
+        "msrp": None,
+        "image_url": None,
+        "description": None,
+        "sources": [r.to_source() for r in results],
+        "verification": None,
+    }
 
 
 def _aggregate_verified_results(
@@ -307,28 +323,30 @@ def _aggregate_verified_results(
     if upc_prices:
         # UPC database prices are most reliable - use the highest one
         msrp = max(upc_prices)
-        print(f"  [MSRP] Using UPC database price: ${msrp:.2f}")
+        log.debug("[MSRP] Using UPC database price: $%.2f", msrp)
     elif other_prices:
         # Fallback to other sources - use highest reasonable price
-        other_prices.sort()
 
-        # Filter outliers: remove prices > 3x the median (likely bundles)
-        median = other_prices[len(other_prices) // 2]
-        reasonable_prices = [p for p in other_prices if p <= median * 3]
+        # Filter outliers: remove prices > 3x the median (likely bundles).
+        # median_high sorts a copy internally; it picks the same element as
+        # the old sorted(...)[n // 2] without reordering other_prices.
+        median = statistics.median_high(other_prices)
+        max_reasonable = median * 3
+        reasonable_prices = [p for p in other_prices if p <= max_reasonable]
 
         if reasonable_prices:
             # MSRP is typically the highest legitimate retail price
             if len(reasonable_prices) >= 4:
                 # Use 75th percentile to avoid outlier highs
                 idx = int(len(reasonable_prices) * 0.75)
-                msrp = reasonable_prices[idx]
+                msrp = heapq.nlargest(len(reasonable_prices) - idx, reasonable_prices)[-1]
             else:
                 # With few prices, use the max
                 msrp = max(reasonable_prices)
         else:
             msrp = max(other_prices)  # Fallback
 
-        print(f"  [MSRP] Using crawled price: ${msrp:.2f}")
+        log.debug("[MSRP] Using crawled price: $%.2f", msrp)
 
     # Pick best image
     image_url = next((r.image_url for r in results if r.image_url), None)
@@ -340,9 +358,7 @@ def _aggregate_verified_results(
     description = max(descriptions, key=len) if descriptions else None
 
     # Build sources list
-    sources = [
-        {"name": r.source, "url": r.url, "found_upc": r.found_upc} for r in results
-    ]
+    sources = [r.to_source() for r in results]
 
     # Calculate final confidence
     if is_exact:
@@ -364,6 +380,6 @@ def _aggregate_verified_results(
             "brand_match": best_verification.brand_match,
             "size_match": best_verification.size_match,
             "color_match": best_verification.color_match,
-            "mismatches": best_verification.mismatches,
+            "mismatches": list(best_verification.mismatches),
         },
     }
@@ -1,23 +1,41 @@
 """
 Sephora crawler implementation.
 """
-import json
+import asyncio
+import orjson
 import re
-from typing import List, Optional
+from typing import List, Optional, Set
 from urllib.parse import quote
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 
+from app.async_cache import cache_successes
 from app.crawlers.base import BaseCrawler, CrawlResult
 
 
+# Number in a price label, e.g. "$16.00" -> "16.00"
+_PRICE_RE = re.compile(r'\$?(\d+\.?\d*)')
+
+# CSS selectors, hoisted so each parse reuses the same strings
+_SEL_PRODUCT_LINK = 'a[href*="/product/"]'
+_SEL_JSON_LD = 'script[type="application/ld+json"]'
+_SEL_TITLE = 'h1[data-at="product_name"]'
+_SEL_PRICE = 'div[data-at="price"]'
+_SEL_IMG = 'img[data-at="product_image"]'
+
+
 class SephoraCrawler(BaseCrawler):
     """Crawler for Sephora.com"""
     
     BASE_URL = "https://www.sephora.com"
     
+    JITTER_RANGE = (0.1, 0.3)
+    
     def __init__(self) -> None:
         super().__init__("sephora")
     
+    # Hits cached per UPC (5 min); concurrent calls for one UPC share the
+    # crawl. Empty results aren't cached: a blocked search also returns []
+    @cache_successes(maxsize=4096, ttl=300.0)
     async def search_by_upc(self, upc: str) -> List[CrawlResult]:
         """
         Search Sephora by UPC.
@@ -37,33 +55,40 @@ class SephoraCrawler(BaseCrawler):
         # Extract product URLs from search results
         product_urls = self._extract_product_urls(html)
         
-        # Fetch each product page (limit to 2)
-        results: List[CrawlResult] = []
-        for url in product_urls[:2]:
-            result = await self._fetch_product_page(url, upc)
-            if result:
-                results.append(result)
+        # Fetch product pages concurrently (limit to 2)
+        pages = await asyncio.gather(
+            *(self._fetch_product_page(url, upc) for url in product_urls[:2]),
+            return_exceptions=True,
+        )
         
-        return results
+        return [page for page in pages if isinstance(page, CrawlResult)]
     
-    def _extract_product_urls(self, html: str) -> List[str]:
-        """Extract product URLs from search results."""
-        soup = BeautifulSoup(html, 'html.parser')
+    def _extract_product_urls(self, html: str | bytes) -> List[str]:
+        """
+        Extract product URLs from search results.
+        
+        URLs are deduplicated in page order, so the first entries are the
+        top-ranked search hits.
+        """
+        tree = HTMLParser(html)
         urls: List[str] = []
+        seen: Set[str] = set()
         
         # Sephora uses data-at attributes for product links
         # This is a simplified selector - real implementation may need adjustment
-        links = soup.select('a[href*="/product/"]')
+        links = tree.css(_SEL_PRODUCT_LINK)
         
         for link in links:
-            href = link.get('href')
+            href = link.attributes.get('href')
             if href:
                 # Handle relative URLs
                 if href.startswith('/'):
                     href = self.BASE_URL + href
-                urls.append(href)
+                if href not in seen:
+                    seen.add(href)
+                    urls.append(href)
         
-        return list(set(urls))  # Remove duplicates
+        return urls
     
     async def _fetch_product_page(self, url: str, expected_upc: str) -> Optional[CrawlResult]:
         """Fetch and parse a product page."""
@@ -75,7 +100,7 @@ class SephoraCrawler(BaseCrawler):
     
     def parse_product_page(
         self, 
-        html: str, 
+        html: str | bytes, 
         url: str,
         expected_upc: Optional[str] = None
     ) -> Optional[CrawlResult]:
@@ -84,14 +109,14 @@ class SephoraCrawler(BaseCrawler):
         
         Sephora typically has JSON-LD structured data which is easier to parse.
         """
-        soup = BeautifulSoup(html, 'html.parser')
+        tree = HTMLParser(html)
         
         # Try to find JSON-LD structured data
-        json_ld = soup.find('script', type='application/ld+json')
+        json_ld = tree.css_first(_SEL_JSON_LD)
         
         if json_ld:
             try:
-                data = json.loads(json_ld.string)
+                data = orjson.loads(json_ld.text())
                 
                 # Extract UPC if present
                 upc = data.get('gtin13') or data.get('gtin12') or data.get('gtin')
@@ -125,15 +150,15 @@ class SephoraCrawler(BaseCrawler):
                     description=data.get('description'),
                 )
                 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 pass
         
         # Fallback: Try to extract from HTML structure
-        return self._parse_html_fallback(soup, url, expected_upc)
+        return self._parse_html_fallback(tree, url, expected_upc)
     
     def _parse_html_fallback(
         self,
-        soup: BeautifulSoup,
+        tree: HTMLParser,
         url: str,
         expected_upc: Optional[str]
     ) -> Optional[CrawlResult]:
@@ -142,23 +167,23 @@ class SephoraCrawler(BaseCrawler):
         
         Note: These selectors may need updates as Sephora changes their HTML.
         """
-        title_elem = soup.select_one('h1[data-at="product_name"]')
-        title = title_elem.text.strip() if title_elem else None
+        title_elem = tree.css_first(_SEL_TITLE)
+        title = title_elem.text().strip() if title_elem else None
         
-        price_elem = soup.select_one('div[data-at="price"]')
+        price_elem = tree.css_first(_SEL_PRICE)
         price = None
         if price_elem:
-            price_text = price_elem.text.strip()
+            price_text = price_elem.text().strip()
             # Extract number from price text (e.g., "$16.00" -> 16.00)
-            price_match = re.search(r'\$?(\d+\.?\d*)', price_text)
+            price_match = _PRICE_RE.search(price_text)
             if price_match:
                 try:
                     price = float(price_match.group(1))
                 except ValueError:
                     pass
         
-        image_elem = soup.select_one('img[data-at="product_image"]')
-        image_url = image_elem.get('src') if image_elem else None
+        image_elem = tree.css_first(_SEL_IMG)
+        image_url = image_elem.attributes.get('src') if image_elem else None
         
         # Try to find UPC in page (often in metadata or product details)
         upc = None
@@ -3,12 +3,28 @@ UPC Database API crawler.
 
 Uses free UPC lookup APIs as a source.
 """
-import json
+import asyncio
+import logging
+import orjson
 from typing import List, Optional
 
+from app.async_cache import cache_successes
 from app.crawlers.base import BaseCrawler, CrawlResult
 
 
+log = logging.getLogger(__name__)
+
+# Only the fields _search_openfoodfacts reads; the full v0 product JSON is
+# often 100-300 KB
+_OFF_FIELDS = "product_name,product_name_en,image_url,image_front_url,generic_name,status"
+
+# Per-UPC hits are cached briefly so retries and duplicate requests don't
+# hit the APIs again; concurrent calls for one UPC share a request. Misses
+# aren't cached, since a timeout or 429 also comes back as None.
+_CACHE_SIZE = 4096
+_CACHE_TTL = 300.0
+
+
 class UPCDatabaseCrawler(BaseCrawler):
     """
     Crawler for UPC Database APIs.
@@ -23,20 +39,18 @@ class UPCDatabaseCrawler(BaseCrawler):
         """
         Search multiple UPC database APIs.
         """
-        results: List[CrawlResult] = []
+        # Query both APIs concurrently:
+        # - UPCitemdb (free, no API key required for limited use)
+        # - Open Food Facts (works for some products)
+        lookups = await asyncio.gather(
+            self._search_upcitemdb(upc),
+            self._search_openfoodfacts(upc),
+            return_exceptions=True,
+        )
         
-        # Try UPCitemdb (free, no API key required for limited use)
-        result = await self._search_upcitemdb(upc)
-        if result:
-            results.append(result)
-        
-        # Try Open Food Facts (works for some products)
-        result = await self._search_openfoodfacts(upc)
-        if result:
-            results.append(result)
-        
-        return results
+        return [result for result in lookups if isinstance(result, CrawlResult)]
     
+    @cache_successes(maxsize=_CACHE_SIZE, ttl=_CACHE_TTL)
     async def _search_upcitemdb(self, upc: str) -> Optional[CrawlResult]:
         """
         Search UPCitemdb.com API.
@@ -46,22 +60,26 @@ class UPCDatabaseCrawler(BaseCrawler):
         url = f"https://api.upcitemdb.com/prod/trial/lookup?upc={upc}"
         
         try:
-            response_text = await self.fetch(url)
-            if not response_text:
+            response_body = await self.fetch(url)
+            if not response_body:
                 return None
             
-            data = json.loads(response_text)
+            data = orjson.loads(response_body)
             
             if data.get('code') == 'OK' and data.get('items'):
                 item = data['items'][0]
                 
                 # Extract price (they provide offers)
-                price = None
-                offers = item.get('offers', [])
-                if offers:
-                    prices = [o.get('price') for o in offers if o.get('price')]
-                    if prices:
-                        price = max(prices)  # MSRP is usually the highest
+                # MSRP is usually the highest offer price
+                price = max(
+                    (p for o in item.get('offers', []) if (p := o.get('price'))),
+                    default=None,
+                )
+                if price is not None:
+                    try:
+                        price = float(price)
+                    except (ValueError, TypeError):
+                        price = None
                 
                 # Get images
                 images = item.get('images', [])
@@ -78,13 +96,14 @@ class UPCDatabaseCrawler(BaseCrawler):
                     description=item.get('description'),
                 )
                 
-        except json.JSONDecodeError:
-            print(f"[upcitemdb] Invalid JSON response for UPC {upc}")
+        except orjson.JSONDecodeError:
+            log.warning("upcitemdb invalid JSON response for UPC %s", upc)
         except Exception as e:
-            print(f"[upcitemdb] Error: {e}")
+            log.warning("upcitemdb error: %s", e)
         
         return None
     
+    @cache_successes(maxsize=_CACHE_SIZE, ttl=_CACHE_TTL)
     async def _search_openfoodfacts(self, upc: str) -> Optional[CrawlResult]:
         """
         Search Open Food Facts API.
@@ -92,14 +111,16 @@ class UPCDatabaseCrawler(BaseCrawler):
         Works primarily for food/cosmetics with barcodes.
         Completely free, no limits.
         """
-        url = f"https://world.openfoodfacts.org/api/v0/product/{upc}.json"
+        url = f"https://world.openfoodfacts.org/api/v2/product/{upc}?fields={_OFF_FIELDS}"
         
         try:
-            response_text = await self.fetch(url)
-            if not response_text:
+            # Projected response is tiny, so don't wait the full 30s. v2
+            # answers unknown barcodes with 404 (v0 sent 200 + status 0).
+            response_body = await self.fetch(url, timeout=5.0, miss_statuses=(404,))
+            if not response_body:
                 return None
             
-            data = json.loads(response_text)
+            data = orjson.loads(response_body)
             
             if data.get('status') == 1 and data.get('product'):
                 product = data['product']
@@ -115,13 +136,13 @@ class UPCDatabaseCrawler(BaseCrawler):
                     description=product.get('generic_name'),
                 )
                 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             pass  # Expected for products not in database
         except Exception as e:
-            print(f"[openfoodfacts] Error: {e}")
+            log.warning("openfoodfacts error: %s", e)
         
         return None
     
-    def parse_product_page(self, html: str, url: str) -> Optional[CrawlResult]:
+    def parse_product_page(self, html: str | bytes, url: str) -> Optional[CrawlResult]:
         """Not used for API-based crawler."""
         return None
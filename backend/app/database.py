@@ -1,18 +1,29 @@
 """
 Database configuration and session management.
 """
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
+import orjson
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
 from app.models import Base
 from app.config import settings
 
 
-# Create async engine
+def _json_serializer(value: Any) -> str:
+    """Serialize JSON/JSONB bind values with orjson (SQLAlchemy wants str)."""
+    return orjson.dumps(value).decode()
+
+
+# Create async engine (async engines default to AsyncAdaptedQueuePool)
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.DEBUG,
-    poolclass=NullPool,  # Simple pool for development
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,  # Drop connections Postgres closed while idle
+    pool_recycle=1800,
+    pool_use_lifo=True,  # Reuse the most recently returned (warm) connection
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 # Create session factory
@@ -27,20 +38,16 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Dependency for getting database sessions.
     
+    The whole request runs in one transaction: committed when the handler
+    returns, rolled back if it raises. Handlers should flush(), not commit().
+    
     Usage in FastAPI:
         @app.get("/")
         async def route(db: AsyncSession = Depends(get_db)):
             ...
     """
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
-            await session.close()
+    async with AsyncSessionLocal() as session, session.begin():
+        yield session
 
 
 async def create_tables() -> None:
@@ -0,0 +1,114 @@
+"""
+Shared outbound HTTP connection pool.
+
+The crawlers, image fetcher and MSRP lookup hit overlapping retailer hosts
+(sephora.com, google.com, ...). Giving their clients one transport lets
+them reuse each other's warm HTTP/2 connections and TLS sessions instead
+of each keeping a separate pool per host.
+
+The pool also caps in-flight requests per host (HTTP_PER_HOST_CONCURRENCY)
+across every client, so a burst of enrichments can't flood one retailer
+(or image CDN) into throttling everyone. That cap is only a backstop.
+Everything the crawlers fetch (retailers, Google, the UPC APIs) goes
+through app.rate_limiter, and the image fetcher has its own per-host
+semaphores; those are the authoritative limits and sit well below it.
+The pool cap only binds for requests outside both, such as image URL
+checks against retailer CDNs.
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+
+# Host -> semaphore bounding in-flight requests to it (created on first use)
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _semaphore_for(host: str) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = _host_semaphores[host] = asyncio.Semaphore(
+            settings.HTTP_PER_HOST_CONCURRENCY
+        )
+    return semaphore
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees its host slot once read or closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, semaphore: asyncio.Semaphore) -> None:
+        self._stream = stream
+        self._semaphore: Optional[asyncio.Semaphore] = semaphore
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._semaphore is not None:
+                self._semaphore.release()
+                self._semaphore = None
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Forwards requests to the shared pool, one host slot per request.
+
+    A client closes its transport on aclose(); this one ignores that, so
+    closing one client doesn't break the others. The real pool is closed
+    by close_shared_transport() at shutdown.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # The slot is held until the body is consumed, not just the headers
+        semaphore = _semaphore_for(request.url.host)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore)  # type: ignore[arg-type]
+        return response
+
+    async def aclose(self) -> None:
+        pass
+
+
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+
+
+def shared_transport() -> httpx.AsyncBaseTransport:
+    """Transport for outbound clients, backed by the process-wide pool."""
+    global _transport
+    if _transport is None:
+        # Per-host limits are applied above (rate limiter, image fetcher
+        # semaphores, the pool cap); these only bound connections overall
+        _transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=1,
+            limits=httpx.Limits(
+                max_connections=200,
+                max_keepalive_connections=100,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _SharedTransport(_transport)
+
+
+async def close_shared_transport() -> None:
+    """Close the shared pool (call once, at shutdown)."""
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
@@ -7,10 +7,43 @@ Uses Transformers.js (CLIP model) for:
 - Visual color/shade verification
 """
 
+import asyncio
 import os
+import time
 import httpx
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set, Tuple
 from dataclasses import dataclass
+from async_lru import alru_cache
+
+
+# How long an is_available() probe result is trusted (seconds)
+AVAILABLE_TTL = 30.0
+UNAVAILABLE_TTL = 5.0
+
+# Model loads (and first-run weight downloads) can take much longer than
+# a single verification
+PRELOAD_TIMEOUT = 120.0
+
+# Successful verifications are reused for the same image + expected
+# product (retailer CDN URLs repeat across requests and variants)
+VERIFY_CACHE_SIZE = 10_000
+VERIFY_CACHE_TTL = 3600.0
+
+# verify_image calls arriving within this window (seconds) from concurrent
+# enrichments are sent as one /verify-image-batch request, so the service
+# runs one CLIP vision pass for all of them
+BATCH_WINDOW = 0.015
+BATCH_MAX_SIZE = 16
+
+# Single verification call timeout (models are already warm). Batch calls
+# run one CLIP inference per image, so theirs grows with the batch size.
+VERIFY_TIMEOUT = 10.0
+BATCH_TIMEOUT_PER_IMAGE = 2.5
+
+
+def _batch_timeout(image_count: int) -> float:
+    """Request timeout for a /verify-image-batch call with this many images."""
+    return VERIFY_TIMEOUT + BATCH_TIMEOUT_PER_IMAGE * image_count
 
 
 @dataclass
@@ -25,6 +58,12 @@ class ImageVerificationResult:
     raw_scores: Optional[Dict[str, float]] = None
 
 
+# A queued micro-batch item: the request payload and its caller's future
+_PendingVerification = Tuple[
+    Dict[str, Optional[str]], "asyncio.Future[ImageVerificationResult]"
+]
+
+
 class ImageVerificationClient:
     """
     Client for the Node.js Image Verification Service.
@@ -32,7 +71,8 @@ class ImageVerificationClient:
     The service must be running on localhost:3001 (or configured URL).
     Start it with: cd image-service && npm start
 
-    Configure via environment variable: IMAGE_SERVICE_URL
+    Configure via environment variables: IMAGE_SERVICE_URL, and
+    IMAGE_MODEL_VERSION to pin the CLIP weights ("quantized" or "fp32")
     """
 
     def __init__(self, base_url: Optional[str] = None):
@@ -40,19 +80,49 @@ class ImageVerificationClient:
         self.base_url = base_url or os.getenv(
             "IMAGE_SERVICE_URL", "http://localhost:3001"
         )
-        self.client = httpx.AsyncClient(timeout=60.0)  # Long timeout for model loading
-        self._is_available: Optional[bool] = None
+        self.model_version = os.getenv("IMAGE_MODEL_VERSION", "quantized")
+        # Models are warmed by preload_models(), so verification calls only
+        # need a short timeout. The service is local HTTP/1.1, so just keep
+        # a small warm pool for bursts of verify calls.
+        self.client = httpx.AsyncClient(
+            timeout=VERIFY_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+        self._is_available = False
+        self._available_until = 0.0  # time.monotonic() deadline
+        self._probe_lock = asyncio.Lock()
+        # Prompts the service has already been asked to encode
+        self._prewarmed: Set[Tuple[str, str, Optional[str], Optional[str]]] = set()
+        # Micro-batch of verify_image payloads waiting to be sent
+        self._batch: List[_PendingVerification] = []
+        self._batch_timer: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: Set["asyncio.Task[None]"] = set()
 
     async def is_available(self) -> bool:
-        """Check if the image service is running."""
-        if self._is_available is not None:
+        """
+        Check if the image service is running.
+
+        The result is cached briefly (longer when healthy) so the service
+        coming up or going down is noticed without probing on every call.
+        """
+        if time.monotonic() < self._available_until:
             return self._is_available
 
-        try:
-            response = await self.client.get(f"{self.base_url}/health")
-            self._is_available = response.status_code == 200
-        except Exception:
-            self._is_available = False
+        # Collapse a burst of callers into a single health probe
+        async with self._probe_lock:
+            if time.monotonic() < self._available_until:
+                return self._is_available
+
+            try:
+                response = await self.client.get(
+                    f"{self.base_url}/health", timeout=1.0
+                )
+                self._is_available = response.status_code == 200
+            except Exception:
+                self._is_available = False
+
+            ttl = AVAILABLE_TTL if self._is_available else UNAVAILABLE_TTL
+            self._available_until = time.monotonic() + ttl
 
         return self._is_available
 
@@ -67,7 +137,9 @@ class ImageVerificationClient:
         """
         Verify that an image matches the expected product.
 
-        Uses CLIP model to compare image to text descriptions.
+        Uses CLIP model to compare image to text descriptions. Calls made
+        concurrently (e.g. from parallel enrichments) are micro-batched into
+        a single service request.
 
         Args:
             image_url: URL of the product image
@@ -98,38 +170,22 @@ class ImageVerificationClient:
             )
 
         try:
-            response = await self.client.post(
-                f"{self.base_url}/verify-image",
-                json={
-                    "image_url": image_url,
-                    "expected_brand": expected_brand,
-                    "expected_product": expected_product,
-                    "expected_color": expected_color,
-                    "expected_size": expected_size,
-                },
+            return await self._verify_image_remote(
+                image_url,
+                expected_brand,
+                expected_product,
+                expected_color,
+                expected_size,
             )
 
-            if response.status_code != 200:
-                return ImageVerificationResult(
-                    is_verified=False,
-                    confidence=0,
-                    brand_detected=False,
-                    product_detected=False,
-                    reasoning=f"Image service error: {response.status_code}",
-                )
-
-            data = response.json()
-            verification = data.get("verification", {})
-
+        except httpx.HTTPStatusError as e:
             return ImageVerificationResult(
-                is_verified=verification.get("is_verified", False),
-                confidence=verification.get("confidence", 0),
-                brand_detected=verification.get("brand_detected", False),
-                product_detected=verification.get("product_detected", False),
-                reasoning=verification.get("reasoning", "Unknown"),
-                raw_scores=data.get("raw_scores"),
+                is_verified=False,
+                confidence=0,
+                brand_detected=False,
+                product_detected=False,
+                reasoning=f"Image service error: {e.response.status_code}",
             )
-
         except httpx.TimeoutException:
             return ImageVerificationResult(
                 is_verified=False,
@@ -147,6 +203,242 @@ class ImageVerificationClient:
                 reasoning=f"Image verification failed: {str(e)}",
             )
 
+    @alru_cache(maxsize=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL)
+    async def _verify_image_remote(
+        self,
+        image_url: str,
+        expected_brand: str,
+        expected_product: str,
+        expected_color: Optional[str],
+        expected_size: Optional[str],
+    ) -> ImageVerificationResult:
+        """
+        Cached body of verify_image.
+
+        Failures raise instead of returning a result, so only real
+        verifications are cached.
+        """
+        future: "asyncio.Future[ImageVerificationResult]" = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._batch.append(
+            (
+                {
+                    "image_url": image_url,
+                    "expected_brand": expected_brand,
+                    "expected_product": expected_product,
+                    "expected_color": expected_color,
+                    "expected_size": expected_size,
+                },
+                future,
+            )
+        )
+
+        if len(self._batch) >= BATCH_MAX_SIZE:
+            self._flush_batch()
+        elif self._batch_timer is None:
+            self._batch_timer = asyncio.get_running_loop().call_later(
+                BATCH_WINDOW, self._flush_batch
+            )
+
+        return await future
+
+    def _flush_batch(self) -> None:
+        """Send the pending micro-batch (runs from the window timer or when full)."""
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            # Keep a reference so the task isn't garbage-collected mid-flight
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(
+        self, batch: List[_PendingVerification]
+    ) -> None:
+        """POST one micro-batch and resolve each caller's future."""
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/verify-image-batch",
+                json={
+                    "items": [item for item, _ in batch],
+                    "model_version": self.model_version,
+                },
+                timeout=_batch_timeout(len(batch)),
+            )
+
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(
+                    f"Image service error: {response.status_code}",
+                    request=response.request,
+                    response=response,
+                )
+
+            results = response.json().get("results", [])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            if future.done():  # caller was cancelled
+                continue
+            data = results[index] if index < len(results) else None
+            if data and data.get("success"):
+                future.set_result(self._parse_verification(data))
+            else:
+                detail = data.get("detail", "Unknown") if data else "missing result"
+                future.set_exception(RuntimeError(detail))
+
+    async def verify_images_batch(
+        self, items: List[Dict[str, Optional[str]]]
+    ) -> List[ImageVerificationResult]:
+        """
+        Verify several images in a single request to the image service.
+
+        The service runs CLIP once per group of items that share the same
+        candidate descriptions, instead of once per HTTP call.
+
+        Args:
+            items: Dicts with the same keys as verify_image's arguments
+                (image_url, expected_brand, expected_product,
+                expected_color, expected_size)
+
+        Returns:
+            One ImageVerificationResult per item, in input order
+        """
+        if not items:
+            return []
+
+        if not await self.is_available():
+            return [
+                self._failed("Image verification service not available")
+                for _ in items
+            ]
+
+        results: List[Optional[ImageVerificationResult]] = [None] * len(items)
+        pending = [i for i, item in enumerate(items) if item.get("image_url")]
+        for i, item in enumerate(items):
+            if not item.get("image_url"):
+                results[i] = self._failed("No image URL provided")
+
+        if pending:
+            try:
+                response = await self.client.post(
+                    f"{self.base_url}/verify-image-batch",
+                    json={
+                        "items": [items[i] for i in pending],
+                        "model_version": self.model_version,
+                    },
+                    timeout=_batch_timeout(len(pending)),
+                )
+
+                if response.status_code != 200:
+                    failed = self._failed(
+                        f"Image service error: {response.status_code}"
+                    )
+                    for i in pending:
+                        results[i] = failed
+                else:
+                    batch = response.json().get("results", [])
+                    for i, data in zip(pending, batch):
+                        results[i] = (
+                            self._parse_verification(data)
+                            if data.get("success")
+                            else self._failed(
+                                f"Image verification failed: {data.get('detail', 'Unknown')}"
+                            )
+                        )
+
+            except httpx.TimeoutException:
+                failed = self._failed(
+                    "Image verification timed out (model may be loading)"
+                )
+                for i in pending:
+                    results[i] = failed
+            except Exception as e:
+                failed = self._failed(f"Image verification failed: {str(e)}")
+                for i in pending:
+                    results[i] = failed
+
+        return [
+            result or self._failed("Image verification failed: missing result")
+            for result in results
+        ]
+
+    @staticmethod
+    def _parse_verification(data: Dict[str, Any]) -> ImageVerificationResult:
+        """Build a result from one /verify-image response payload."""
+        verification = data.get("verification", {})
+
+        return ImageVerificationResult(
+            is_verified=verification.get("is_verified", False),
+            confidence=verification.get("confidence", 0),
+            brand_detected=verification.get("brand_detected", False),
+            product_detected=verification.get("product_detected", False),
+            reasoning=verification.get("reasoning", "Unknown"),
+            raw_scores=data.get("raw_scores"),
+        )
+
+    @staticmethod
+    def _failed(reasoning: str) -> ImageVerificationResult:
+        """Build an unverified result carrying the failure reason."""
+        return ImageVerificationResult(
+            is_verified=False,
+            confidence=0,
+            brand_detected=False,
+            product_detected=False,
+            reasoning=reasoning,
+        )
+
+    async def prewarm_text_embedding(
+        self,
+        expected_brand: str,
+        expected_product: str,
+        expected_color: Optional[str] = None,
+        expected_size: Optional[str] = None,
+    ) -> bool:
+        """
+        Ask the service to encode a product's CLIP text prompts ahead of
+        verify_image, so verification only has to encode the image.
+
+        Best effort: each product is only sent once per process.
+        """
+        key = (
+            expected_brand.lower(),
+            expected_product.lower(),
+            expected_color,
+            expected_size,
+        )
+        if key in self._prewarmed or not await self.is_available():
+            return False
+
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/prewarm-text",
+                json={
+                    "expected_brand": expected_brand,
+                    "expected_product": expected_product,
+                    "expected_color": expected_color,
+                    "expected_size": expected_size,
+                    "model_version": self.model_version,
+                },
+            )
+        except Exception:
+            return False
+
+        if response.status_code != 200:
+            return False
+
+        if len(self._prewarmed) >= VERIFY_CACHE_SIZE:
+            self._prewarmed.clear()
+        self._prewarmed.add(key)
+        return True
+
     async def extract_product_type(self, text: str) -> Dict[str, Any]:
         """
         Extract product type from text using zero-shot classification.
@@ -183,13 +475,20 @@ class ImageVerificationClient:
             return False
 
         try:
-            response = await self.client.post(f"{self.base_url}/preload")
+            response = await self.client.post(
+                f"{self.base_url}/preload",
+                json={"model_version": self.model_version},
+                timeout=PRELOAD_TIMEOUT,
+            )
             return response.status_code == 200
         except Exception:
             return False
 
     async def close(self) -> None:
         """Close the HTTP client."""
+        self._flush_batch()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
         await self.client.aclose()
 
 
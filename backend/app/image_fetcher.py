@@ -7,11 +7,40 @@ Tries multiple strategies to find a product image:
 3. Fetch from known retailer sites
 """
 
+import asyncio
+import logging
 import re
 import httpx
-from typing import Optional, List
+from typing import Iterator, Optional, List
 from urllib.parse import quote
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
+
+from app.config import settings
+from app.http_pool import shared_transport
+
+
+log = logging.getLogger(__name__)
+
+# Characters replaced with spaces when building an image search query
+_QUERY_CLEAN_RE = re.compile(r"[#/\-]")
+
+# Image URLs embedded in Google's inline script JSON
+_SCRIPT_IMG_URL_RE = re.compile(r'https?://[^"\'<>\s]+\.(?:jpg|jpeg|png|webp)')
+
+
+def _img_srcs(tree: HTMLParser) -> Iterator[str]:
+    """
+    Yield each <img>'s src (falling back to data-src), in page order.
+
+    Lazy so callers stop at the first acceptable URL. Uses Node.attrs,
+    which looks attributes up directly instead of building a dict of all
+    of them on each access like Node.attributes does.
+    """
+    for img in tree.css("img"):
+        attrs = img.attrs
+        src = attrs.get("src") or attrs.get("data-src")
+        if src:
+            yield src
 
 
 class ImageFetcher:
@@ -20,8 +49,11 @@ class ImageFetcher:
     """
 
     def __init__(self) -> None:
+        # HTTP/2 + keep-alive via the shared pool: Google/Sephora lookups
+        # reuse the crawlers' warm TLS sessions
         self.client = httpx.AsyncClient(
-            timeout=15.0,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            transport=shared_transport(),
             follow_redirects=True,
             headers={
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -29,6 +61,10 @@ class ImageFetcher:
                 "Accept-Language": "en-US,en;q=0.5",
             },
         )
+        # Bound concurrent hits per host across all in-flight enrichments,
+        # so bursts don't trip retailer 429s
+        self._google_sema = asyncio.Semaphore(settings.GOOGLE_IMAGES_CONCURRENCY)
+        self._sephora_sema = asyncio.Semaphore(settings.SEPHORA_CONCURRENCY)
 
     async def fetch_image(
         self,
@@ -56,12 +92,10 @@ class ImageFetcher:
         if image_url:
             return image_url
 
-        # Strategy 3: Try direct retailer search
-        image_url = await self._search_sephora_images(brand, product_name)
-        if image_url:
-            return image_url
-
-        return None
+        # Strategy 3: Try direct retailer search. Only on a Google miss:
+        # Sephora already rate-limits us, so don't spend requests there
+        # speculatively.
+        return await self._search_sephora_images(brand, product_name)
 
     async def _is_valid_image(self, url: str) -> bool:
         """Check if image URL is valid and accessible."""
@@ -69,9 +103,21 @@ class ImageFetcher:
             return False
 
         try:
-            response = await self.client.head(url)
-            content_type = response.headers.get("content-type", "")
-            return response.status_code == 200 and "image" in content_type
+            # Ranged GET rather than HEAD: many CDNs reject HEAD, and the
+            # first bytes let us sniff the format behind a misleading header
+            response = await self.client.get(url, headers={"Range": "bytes=0-63"})
+            if response.status_code not in (200, 206):
+                return False
+
+            if "image" in response.headers.get("content-type", ""):
+                return True
+
+            body = response.content
+            return (
+                body[:3] == b"\xff\xd8\xff"  # JPEG
+                or body[:8] == b"\x89PNG\r\n\x1a\n"  # PNG
+                or (body[:4] == b"RIFF" and body[8:12] == b"WEBP")
+            )
         except Exception:
             return False
 
@@ -81,44 +127,45 @@ class ImageFetcher:
         """Search Google Images for product."""
 
         # Clean up product name for search
-        query = f"{brand} {product_name}".replace("-", " ")
-        query = re.sub(r"[#/]", " ", query)
+        query = _QUERY_CLEAN_RE.sub(" ", f"{brand} {product_name}")
         query = " ".join(query.split())  # Normalize whitespace
 
         url = f"https://www.google.com/search?q={quote(query)}&tbm=isch"
 
         try:
-            response = await self.client.get(url)
+            async with self._google_sema:
+                response = await self.client.get(url)
             if response.status_code != 200:
                 return None
 
-            html = response.text
-
             # Google Images embeds image URLs in various ways
             # Try to extract from the page
 
             # Method 1: Look for direct image URLs in data attributes
-            soup = BeautifulSoup(html, "html.parser")
-
-            # Find image elements
-            for img in soup.find_all("img"):
-                src = img.get("src") or img.get("data-src")
-                if src and src.startswith("http") and "gstatic" not in src:
-                    # Skip Google's own images
-                    if "google.com" not in src and "gstatic.com" not in src:
-                        return src
+            tree = HTMLParser(response.content)
+
+            # Find image elements, skipping Google's own images
+            image_url = next(
+                (
+                    src
+                    for src in _img_srcs(tree)
+                    if src.startswith("http")
+                    and "gstatic" not in src
+                    and "google.com" not in src
+                ),
+                None,
+            )
+            if image_url:
+                return image_url
 
             # Method 2: Look for encoded image URLs in scripts
             # Google often includes full URLs in JSON data
-            import json
-
-            for script in soup.find_all("script"):
-                if script.string and "http" in (script.string or ""):
+            for script in tree.css("script"):
+                script_text = script.text()
+                if "http" in script_text:
                     # Look for image URLs in the script
-                    urls = re.findall(
-                        r'https?://[^"\'<>\s]+\.(?:jpg|jpeg|png|webp)', script.string
-                    )
-                    for img_url in urls:
+                    for url_match in _SCRIPT_IMG_URL_RE.finditer(script_text):
+                        img_url = url_match.group(0)
                         # Skip Google's own images
                         if "gstatic.com" not in img_url and "google.com" not in img_url:
                             # Unescape the URL
@@ -130,7 +177,7 @@ class ImageFetcher:
             return None
 
         except Exception as e:
-            print(f"[ImageFetcher] Google Images error: {e}")
+            log.warning("ImageFetcher Google Images error: %s", e)
             return None
 
     async def _search_sephora_images(
@@ -138,29 +185,33 @@ class ImageFetcher:
     ) -> Optional[str]:
         """Try to find image from Sephora."""
 
-        query = f"{brand} {product_name}".split("-")[0].strip()
+        query = f"{brand} {product_name}".partition("-")[0].strip()
         url = f"https://www.sephora.com/search?keyword={quote(query)}"
 
         try:
-            response = await self.client.get(url)
+            async with self._sephora_sema:
+                response = await self.client.get(url)
             if response.status_code != 200:
                 return None
 
-            soup = BeautifulSoup(response.text, "html.parser")
+            tree = HTMLParser(response.text)
 
             # Look for product images
-            for img in soup.find_all("img"):
-                src = img.get("src") or img.get("data-src")
-                if src and "sephora" in src and ("product" in src or "sku" in src):
-                    # Make sure it's a full URL
-                    if not src.startswith("http"):
-                        src = "https://www.sephora.com" + src
-                    return src
-
-            return None
+            src = next(
+                (
+                    src
+                    for src in _img_srcs(tree)
+                    if "sephora" in src and ("product" in src or "sku" in src)
+                ),
+                None,
+            )
+            # Make sure it's a full URL
+            if src and not src.startswith("http"):
+                src = "https://www.sephora.com" + src
+            return src
 
         except Exception as e:
-            print(f"[ImageFetcher] Sephora error: {e}")
+            log.warning("ImageFetcher Sephora error: %s", e)
             return None
 
     async def fetch_image_for_gift_set(
@@ -210,13 +261,19 @@ class ImageFetcher:
         try:
             response = await self.client.get(url)
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
-                for img in soup.find_all("img"):
-                    src = img.get("src") or img.get("data-src")
-                    if src and "fragrancenet" in src and ".jpg" in src:
-                        if not src.startswith("http"):
-                            src = "https://www.fragrancenet.com" + src
-                        return src
+                tree = HTMLParser(response.text)
+                src = next(
+                    (
+                        src
+                        for src in _img_srcs(tree)
+                        if "fragrancenet" in src and ".jpg" in src
+                    ),
+                    None,
+                )
+                if src:
+                    if not src.startswith("http"):
+                        src = "https://www.fragrancenet.com" + src
+                    return src
         except Exception:
             pass
 
@@ -2,24 +2,56 @@
 Main FastAPI application.
 """
 
+import logging
+import logging.handlers
+import queue
+import sys
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Annotated, AsyncGenerator, List
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import Body, FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
 from app.database import get_db, create_tables
+from app.http_pool import close_shared_transport
+from app.image_fetcher import image_fetcher
+from app.msrp_lookup import msrp_lookup
 from app.schemas import ProductInput, ProductOutput, ErrorResponse
 from app.service import EnrichmentService
 
 
+log = logging.getLogger(__name__)
+
+
+def _start_log_listener() -> logging.handlers.QueueListener:
+    """
+    Route app logs through a queue so handler I/O runs on a background
+    thread instead of blocking the event loop.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.setLevel(logging.DEBUG if settings.DEBUG else logging.WARNING)
+    app_logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
 # Lifespan context manager for startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Handle startup and shutdown events."""
     # Startup
+    log_listener = _start_log_listener()
+
     print("Creating database tables...")
     await create_tables()
     print("✅ Database ready")
@@ -45,14 +77,15 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Shutdown
     print("Server shutting down...")
     await image_client.close()
-
-    from app.image_fetcher import image_fetcher
+    await enrichment_service.close()
 
     await image_fetcher.close()
+    await msrp_lookup.close()
 
-    from app.msrp_lookup import msrp_lookup
+    # The crawler/image/MSRP clients above share one connection pool
+    await close_shared_transport()
 
-    await msrp_lookup.close()
+    log_listener.stop()
 
 
 # Create FastAPI app
@@ -61,6 +94,7 @@ app = FastAPI(
     description="Beauty product lookup tool with web crawling",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Add CORS middleware
@@ -128,6 +162,48 @@ async def enrich_product(
         )
 
 
+@app.post(
+    "/api/enrich/batch",
+    response_model=List[ProductOutput],
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid input"},
+        500: {"model": ErrorResponse, "description": "Server error"},
+    },
+)
+async def enrich_products_batch(
+    products: Annotated[
+        List[ProductInput], Body(max_length=settings.BATCH_MAX_SIZE)
+    ],
+    db: AsyncSession = Depends(get_db),
+) -> List[ProductOutput]:
+    """
+    Enrich a list of products (e.g. a wholesale catalog) in one call.
+
+    Cached UPCs are looked up with a single query; the rest are crawled
+    concurrently. At most settings.BATCH_MAX_SIZE products per request
+    (longer lists are rejected with 422 during validation); a product that
+    fails to enrich comes back with confidence 0.
+
+    Args:
+        products: Product inputs (name, brand, UPC, size, color)
+        db: Database session (injected)
+
+    Returns:
+        List[ProductOutput]: Enriched data, in input order
+
+    Raises:
+        HTTPException: If enrichment fails
+    """
+    try:
+        return await enrichment_service.enrich_products_batch(products, db)
+
+    except Exception as e:
+        log.exception("Batch enrichment failed")
+        raise HTTPException(
+            status_code=500, detail=f"Failed to enrich products: {str(e)}"
+        )
+
+
 @app.get("/api/health")
 async def health_check() -> dict:
     """Detailed health check."""
@@ -159,7 +235,7 @@ async def get_all_cached(db: AsyncSession = Depends(get_db)) -> dict:
                 "product_name": p.product_name,
                 "size": p.size,
                 "color": p.color,
-                "msrp": float(p.msrp) if p.msrp else None,
+                "msrp": p.msrp or None,
                 "image_url": p.image_url,
                 "description": (
                     p.description[:100] + "..."
@@ -199,7 +275,7 @@ async def delete_all_cached(db: AsyncSession = Depends(get_db)) -> dict:
     # Delete all records
     stmt = delete(EnrichedProduct)
     await db.execute(stmt)
-    await db.commit()
+    enrichment_service.clear_cache()
 
     return {
         "success": True,
@@ -211,6 +287,14 @@ async def delete_all_cached(db: AsyncSession = Depends(get_db)) -> dict:
 if __name__ == "__main__":
     import uvicorn
 
+    # uvloop + httptools come with uvicorn[standard]; pin them explicitly so
+    # a missing extra fails loudly instead of silently falling back to
+    # asyncio/h11. uvloop has no Windows build.
     uvicorn.run(
-        "app.main:app", host=settings.HOST, port=settings.PORT, reload=settings.DEBUG
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        reload=settings.DEBUG,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
     )
@@ -2,8 +2,9 @@
 Database models for product enrichment system.
 """
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import String, Integer, Numeric, DateTime, Text, JSON
+from typing import Any, Dict, List, Optional, Union
+from sqlalchemy import String, Integer, Numeric, DateTime, Text, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -19,6 +20,10 @@ class EnrichedProduct(Base):
     UPC is the primary unique identifier.
     """
     __tablename__ = "enriched_products"
+    __table_args__ = (
+        # Lookups by brand + product name
+        Index("ix_enriched_products_brand_name", "brand", "product_name"),
+    )
     
     # Primary key
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -31,27 +36,41 @@ class EnrichedProduct(Base):
     color: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     # Enriched data (what we found)
-    msrp: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    # Stored as NUMERIC(10,2) but loaded as float (no Decimal per row)
+    msrp: Mapped[Optional[float]] = mapped_column(Numeric(10, 2, asdecimal=False), nullable=True)
     image_url: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Metadata
     confidence_score: Mapped[int] = mapped_column(Integer, nullable=False)  # 0-100
-    sources: Mapped[dict] = mapped_column(JSON, nullable=False)  # Which retailers confirmed this
+    # Which retailers confirmed this: a flat list of source entries.
+    # Rows written before that are {"sources": [...]}.
+    sources: Mapped[Union[List[Dict[str, Any]], Dict[str, Any]]] = mapped_column(
+        JSONB, nullable=False
+    )
     source_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     
-    # Timestamps
+    # Timestamps, computed by the database as now(). `default` renders
+    # now() into every INSERT (ORM and Core upserts alike), so tables
+    # created before server_default existed (NOT NULL, no DB default)
+    # still get a value; `server_default` covers new tables and raw SQL.
     created_at: Mapped[datetime] = mapped_column(
         DateTime, 
         nullable=False, 
-        default=datetime.utcnow
+        default=func.now(),
+        server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime,
         nullable=False,
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow
+        default=func.now(),
+        server_default=func.now(),
+        onupdate=func.now()
     )
     
+    # Fetch server-generated timestamps via RETURNING on insert, so reading
+    # them later never triggers a lazy load (not allowed under asyncio)
+    __mapper_args__ = {"eager_defaults": True}
+    
     def __repr__(self) -> str:
         return f"<EnrichedProduct(upc={self.upc}, brand={self.brand}, confidence={self.confidence_score})>"
@@ -10,11 +10,158 @@ The key insight: MSRP is the HIGHEST legitimate retail price.
 Sale prices, clearance, and third-party sellers are always lower.
 """
 
+import asyncio
+import logging
 import re
+import statistics
 import httpx
-from typing import Optional, List, Tuple
-from urllib.parse import quote
-from bs4 import BeautifulSoup
+from functools import lru_cache
+import orjson
+from typing import Callable, Dict, Iterator, Optional, List, Sequence, Tuple
+from urllib.parse import quote, urlparse
+from selectolax.parser import HTMLParser
+
+from app.async_cache import cache_successes
+from app.http_pool import shared_transport
+from app.rate_limiter import rate_limiter
+
+
+log = logging.getLogger(__name__)
+
+# USD prices in any of the three formats, found in a single pass:
+# "$12.99" / "$1,299.99", "USD 12.99", "12.99 dollars"
+_PRICE_RE = re.compile(
+    r"\$(?P<a>\d{1,3}(?:,\d{3})*(?:\.\d{2})?)"
+    r"|USD\s*(?P<b>\d+(?:\.\d{2})?)"
+    r"|(?P<c>\d+(?:\.\d{2})?)\s*dollars",
+    re.IGNORECASE,
+)
+
+# Characters replaced with spaces in search queries
+_QUERY_SANITIZE = re.compile(r"[#/]")
+
+# Retail prices change slowly, so retailer hits are reused for an hour.
+# Misses aren't cached: errors and 429s also come back as None.
+_CACHE_SIZE = 4096
+_CACHE_TTL = 3600.0
+
+
+def _keyword_matcher(keywords: Sequence[str]) -> Callable[[str], Optional[str]]:
+    """
+    Build a matcher returning the earliest-listed keyword found in a text.
+
+    Same result as `next((k for k in keywords if k in text), None)`, but
+    the text is scanned once by a single compiled pattern instead of once
+    per keyword. The lookahead reports a hit at every position, so a keyword
+    overlapping another match is never missed.
+    """
+    rank = {keyword: i for i, keyword in enumerate(keywords)}
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, keywords)) + "))")
+
+    def match(text: str) -> Optional[str]:
+        found = [m.group(1) for m in pattern.finditer(text)]
+        return min(found, key=rank.__getitem__) if found else None
+
+    return match
+
+
+# Known beauty retailer price patterns
+_PRICE_SELECTORS: Dict[str, Tuple[str, ...]] = {
+    "sephora": (
+        'span[data-at="price"]',
+        ".css-0.e65hsk0",  # Sephora's price class
+        "span.css-1jczs19",
+    ),
+    "ulta": (
+        ".ProductPricing",
+        "span.ProductPricingPaid",
+        ".product-price",
+    ),
+    "nordstrom": (
+        'span[itemprop="price"]',
+        ".product-price",
+    ),
+}
+
+# Retailers' own JSON search APIs, tried before the Google site: search.
+# Much smaller responses, and they don't count against Google's limits.
+_RETAILER_SEARCH_APIS: Dict[str, str] = {
+    "sephora": "https://www.sephora.com/api/v2/catalog/search/?keyword={query}",
+}
+
+# Major retailers to check (in order of trustworthiness)
+# URL templates are Google site: searches, the fallback when a retailer
+# has no search API above (or it returns nothing)
+_AUTHORITATIVE_RETAILERS: Tuple[Tuple[str, str], ...] = (
+    ("sephora", "https://www.google.com/search?q=site:sephora.com+{query}"),
+    ("ulta", "https://www.google.com/search?q=site:ulta.com+{query}"),
+    ("nordstrom", "https://www.google.com/search?q=site:nordstrom.com+{query}"),
+    ("macys", "https://www.google.com/search?q=site:macys.com+{query}"),
+)
+
+# Check specific patterns first (order matters!)
+# More specific → less specific
+_PRICE_MINIMUMS: Tuple[Tuple[str, int], ...] = (
+    ("mud mask", 24),  # Mud masks $24-35
+    ("sheet mask", 15),  # Sheet masks $15-25
+    ("face mask", 22),  # Face masks $22-40
+    ("mask", 20),  # Generic masks $20+
+    ("lip liner", 14),  # Premium lip liners $14-25
+    ("lip gloss", 14),  # Lip gloss $14-28
+    ("lipstick", 14),  # Premium lipsticks $14-40
+    ("lip", 14),  # Generic lip products $14+
+    ("foundation", 25),  # Premium foundations $25-60
+    ("mascara", 14),  # Premium mascara $14-30
+    ("eyeshadow", 18),  # Premium eyeshadow $18-50
+    ("cleanser", 18),  # Premium cleansers $18-45
+    ("moisturizer", 22),  # Premium moisturizers $22-80
+    ("serum", 30),  # Serums $30-150
+    ("eau de parfum", 60),  # EDP $60-200
+    ("eau de toilette", 45),  # EDT $45-150
+    ("fragrance", 50),  # Fragrances $50-200
+    ("perfume", 50),  # Perfumes $50-200
+    ("cologne", 45),  # Cologne $45-150
+    ("gift set", 45),  # Gift sets $45-200
+    ("palette", 25),  # Makeup palettes $25-65
+    ("primer", 20),  # Primers $20-45
+    ("concealer", 16),  # Concealers $16-35
+    ("blush", 18),  # Blush $18-40
+    ("bronzer", 20),  # Bronzer $20-45
+    ("highlighter", 20),  # Highlighter $20-45
+    ("setting spray", 18),  # Setting sprays $18-35
+    ("setting powder", 20),  # Setting powder $20-40
+)
+
+_MIN_PRICES = dict(_PRICE_MINIMUMS)
+_match_min_price_type = _keyword_matcher([name for name, _ in _PRICE_MINIMUMS])
+
+# Price ranges for common beauty product types (first match wins)
+_PRICE_RANGES: Dict[str, Tuple[int, int]] = {
+    "lip liner": (8, 40),
+    "lipstick": (8, 50),
+    "foundation": (15, 80),
+    "mascara": (8, 40),
+    "eyeshadow": (10, 60),
+    "mask": (10, 60),
+    "mud mask": (15, 50),
+    "cleanser": (10, 60),
+    "moisturizer": (15, 100),
+    "serum": (20, 150),
+    "fragrance": (30, 300),
+    "gift set": (30, 200),
+    "default": (5, 200),
+}
+
+_match_price_range_type = _keyword_matcher(
+    [name for name in _PRICE_RANGES if name != "default"]
+)
+
+
+@lru_cache(maxsize=1024)
+def _expected_price_range(product_type: str) -> Tuple[int, int]:
+    """(min, max) typical price for a product type; first listed match wins."""
+    match = _match_price_range_type(product_type.lower())
+    return _PRICE_RANGES[match or "default"]
 
 
 class MSRPLookup:
@@ -22,35 +169,13 @@ class MSRPLookup:
     Looks up MSRP from authoritative sources.
     """
 
-    # Known beauty retailer price patterns
-    PRICE_SELECTORS = {
-        "sephora": [
-            'span[data-at="price"]',
-            ".css-0.e65hsk0",  # Sephora's price class
-            "span.css-1jczs19",
-        ],
-        "ulta": [
-            ".ProductPricing",
-            "span.ProductPricingPaid",
-            ".product-price",
-        ],
-        "nordstrom": [
-            'span[itemprop="price"]',
-            ".product-price",
-        ],
-    }
-
-    # Major retailers to check (in order of trustworthiness)
-    AUTHORITATIVE_RETAILERS = [
-        ("sephora", "https://www.google.com/search?q=site:sephora.com+{query}"),
-        ("ulta", "https://www.google.com/search?q=site:ulta.com+{query}"),
-        ("nordstrom", "https://www.google.com/search?q=site:nordstrom.com+{query}"),
-        ("macys", "https://www.google.com/search?q=site:macys.com+{query}"),
-    ]
-
     def __init__(self) -> None:
+        # HTTP/2 + a warm pool: the retailer searches fan out to a handful
+        # of hosts, so reuse TLS sessions instead of re-handshaking. The
+        # pool is shared with the crawlers (see app.http_pool).
         self.client = httpx.AsyncClient(
-            timeout=10.0,
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            transport=shared_transport(),
             follow_redirects=True,
             headers={
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
@@ -75,24 +200,109 @@ class MSRPLookup:
         Returns:
             (msrp, source) - The MSRP and where it came from
         """
+        # Not cached as a whole: a retailer search that failed now may
+        # succeed on the next lookup. Successful searches are cached below.
+        quoted_query = self._build_query(brand, product_name)
+
+        # Retailers are independent, so search them concurrently
+        results = await asyncio.gather(
+            *(
+                self._search_retailer(retailer, url_template, quoted_query)
+                for retailer, url_template in _AUTHORITATIVE_RETAILERS
+            ),
+            return_exceptions=True,
+        )
+
+        found: List[Tuple[float, str]] = []
+        for (retailer, _), price in zip(_AUTHORITATIVE_RETAILERS, results):
+            if isinstance(price, BaseException):
+                log.warning("[MSRP] %s error: %s", retailer, price)
+            elif price:
+                found.append((price, retailer))
+                log.debug("[MSRP] Found $%.2f from %s", price, retailer)
+
+        return self._pick_msrp(current_prices, found)
+
+    async def lookup_msrp_batch(
+        self,
+        products: Sequence[Tuple[str, str, List[float]]],
+    ) -> List[Tuple[Optional[float], str]]:
+        """
+        Look up MSRPs for many products at once.
+
+        Retailer searches are queued per host and drained by as many
+        workers as that host's rate limit allows
+        (RateLimitConfig.max_concurrent). All the retailer searches go
+        through Google today, so they share one queue and one set of
+        workers. A slow search for one product overlaps with other
+        products' searches instead of stalling the batch.
+
+        Args:
+            products: (brand, product_name, current_prices) per product
+
+        Returns:
+            (msrp, source) per product, in input order
+        """
+        queries = [self._build_query(brand, name) for brand, name, _ in products]
+        found: List[List[Tuple[float, str]]] = [[] for _ in products]
+
+        async def worker(queue: "asyncio.Queue[Tuple[str, str, int]]") -> None:
+            # Queues are filled before workers start, so empty means done
+            while not queue.empty():
+                retailer, url_template, index = queue.get_nowait()
+                try:
+                    # Paced by the domain limiter inside _search_retailer
+                    price = await self._search_retailer(
+                        retailer, url_template, queries[index]
+                    )
+                except Exception as e:
+                    log.warning("[MSRP] %s error: %s", retailer, e)
+                    continue
+                if price:
+                    found[index].append((price, retailer))
+
+        queues: Dict[str, "asyncio.Queue[Tuple[str, str, int]]"] = {}
+        for index in range(len(products)):
+            for retailer, url_template in _AUTHORITATIVE_RETAILERS:
+                host = urlparse(url_template).netloc
+                queues.setdefault(host, asyncio.Queue()).put_nowait(
+                    (retailer, url_template, index)
+                )
+
+        workers = [
+            worker(queue)
+            for host, queue in queues.items()
+            for _ in range(rate_limiter.get_limiter(host).config.max_concurrent)
+        ]
+
+        await asyncio.gather(*workers)
+
+        return [
+            self._pick_msrp(current_prices, found[index])
+            for index, (_, _, current_prices) in enumerate(products)
+        ]
+
+    @staticmethod
+    def _build_query(brand: str, product_name: str) -> str:
+        """Build the URL-encoded retailer search query for a product."""
+        query = f"{brand} {product_name}".partition("-")[0].strip()
+        query = _QUERY_SANITIZE.sub(" ", query)
+        # Same query for every retailer, so URL-encode it once
+        return quote(query)
+
+    @staticmethod
+    def _pick_msrp(
+        current_prices: Sequence[float],
+        found: List[Tuple[float, str]],
+    ) -> Tuple[Optional[float], str]:
+        """Choose the MSRP from crawled prices and retailer search hits."""
         all_prices: List[Tuple[float, str]] = []
 
         # Add current prices
         for p in current_prices:
             all_prices.append((p, "crawler"))
 
-        # Search authoritative retailers
-        query = f"{brand} {product_name}".split("-")[0].strip()
-        query = re.sub(r"[#/]", " ", query)
-
-        for retailer, url_template in self.AUTHORITATIVE_RETAILERS:
-            try:
-                price = await self._search_retailer(retailer, url_template, query)
-                if price:
-                    all_prices.append((price, retailer))
-                    print(f"  [MSRP] Found ${price:.2f} from {retailer}")
-            except Exception as e:
-                print(f"  [MSRP] {retailer} error: {e}")
+        all_prices += found
 
         if not all_prices:
             return None, "none"
@@ -111,7 +321,7 @@ class MSRPLookup:
 
         # Fallback to crawled prices
         prices = [p for p, s in all_prices]
-        median = sorted(prices)[len(prices) // 2]
+        median = statistics.median_high(prices)
         reasonable = [p for p in prices if p <= median * 3]
 
         if reasonable:
@@ -119,55 +329,115 @@ class MSRPLookup:
 
         return max(prices), "crawler"
 
+    @cache_successes(maxsize=_CACHE_SIZE, ttl=_CACHE_TTL)
     async def _search_retailer(
-        self, retailer: str, url_template: str, query: str
+        self, retailer: str, url_template: str, quoted_query: str
     ) -> Optional[float]:
-        """Search a specific retailer for price."""
+        """
+        Search a specific retailer for price.
 
-        url = url_template.format(query=quote(query))
+        quoted_query is already URL-encoded; templates have a single
+        {query} placeholder, filled with str.replace rather than format().
+        """
+
+        price = await self._search_retailer_api(retailer, quoted_query)
+        if price:
+            return price
+
+        url = url_template.replace("{query}", quoted_query)
 
         try:
-            response = await self.client.get(url)
+            # The site: searches all go to Google; share its domain limiter
+            # with the crawlers so a concurrent fan-out can't burst past it
+            async with rate_limiter.get_limiter(urlparse(url).netloc):
+                response = await self.client.get(url)
             if response.status_code != 200:
                 return None
 
-            html = response.text
+            # Google and these retailers serve UTF-8; skip httpx's charset
+            # detection that response.text may fall back to
+            html = response.content.decode("utf-8", "ignore")
 
-            # Extract prices from Google search results
-            # Google often shows prices in snippets
-            prices = self._extract_prices_from_text(html)
+            # Prefer prices in the retailer's known price elements; otherwise
+            # fall back to scanning Google's result snippets
+            prices = self._extract_prices_from_text(
+                " ".join(self._extract_with_selectors(html, retailer))
+            ) or self._extract_prices_from_text(html)
 
             if prices:
                 # Return the most common/median price
-                prices.sort()
-                return prices[len(prices) // 2]
+                return statistics.median_high(prices)
+
+            return None
+
+        except Exception:
+            return None
 
+    async def _search_retailer_api(
+        self, retailer: str, quoted_query: str
+    ) -> Optional[float]:
+        """
+        Search the retailer's own JSON search API for a list price.
+
+        Returns None if the retailer has no API configured or the lookup
+        fails, so the caller can fall back to scraping.
+        """
+        url_template = _RETAILER_SEARCH_APIS.get(retailer)
+        if not url_template:
             return None
 
+        url = url_template.replace("{query}", quoted_query)
+
+        try:
+            async with rate_limiter.get_limiter(urlparse(url).netloc):
+                response = await self.client.get(
+                    url, headers={"Accept": "application/json"}
+                )
+            if response.status_code != 200:
+                return None
+
+            data = orjson.loads(response.content)
+
+            # products[].currentSku.listPrice, e.g. "$24.00" or "$20.00 - $34.00"
+            prices: List[float] = []
+            for product in data.get("products") or ():
+                sku = product.get("currentSku") or {}
+                list_price = sku.get("listPrice")
+                if isinstance(list_price, str):
+                    prices.extend(self._extract_prices_from_text(list_price)[:1])
+
+            return statistics.median_high(prices) if prices else None
+
         except Exception:
+            # Includes an unexpected response shape (non-dict products,
+            # missing keys); treat like a failed lookup and fall back
             return None
 
+    def _extract_with_selectors(self, html: str, retailer: str) -> Iterator[str]:
+        """Yield the text of elements matching the retailer's price selectors."""
+        selectors = _PRICE_SELECTORS.get(retailer)
+        if not selectors:
+            return
+
+        tree = HTMLParser(html)
+        for selector in selectors:
+            for node in tree.css(selector):
+                yield node.text()
+
     def _extract_prices_from_text(self, text: str) -> List[float]:
         """Extract all USD prices from text."""
 
         # Find all price patterns
-        patterns = [
-            r"\$(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)",  # $12.99 or $1,299.99
-            r"USD\s*(\d+(?:\.\d{2})?)",  # USD 12.99
-            r"(\d+(?:\.\d{2})?)\s*dollars",  # 12.99 dollars
-        ]
-
         prices = []
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                try:
-                    price = float(match.replace(",", ""))
-                    # Filter unreasonable prices for beauty products
-                    if 1 <= price <= 500:  # Beauty products typically $1-$500
-                        prices.append(price)
-                except ValueError:
-                    pass
+        for match in _PRICE_RE.finditer(text):
+            amount = match.group("a") or match.group("b") or match.group("c")
+            try:
+                price = float(amount.replace(",", ""))
+                # Filter unreasonable prices for beauty products
+                if 1 <= price <= 500:  # Beauty products typically $1-$500
+                    prices.append(price)
+            except ValueError:
+                pass
 
         return prices
 
@@ -183,34 +453,9 @@ class MSRPLookup:
         Returns:
             (is_valid, reason)
         """
-        # Price ranges for common beauty product types
-        PRICE_RANGES = {
-            "lip liner": (8, 40),
-            "lipstick": (8, 50),
-            "foundation": (15, 80),
-            "mascara": (8, 40),
-            "eyeshadow": (10, 60),
-            "mask": (10, 60),
-            "mud mask": (15, 50),
-            "cleanser": (10, 60),
-            "moisturizer": (15, 100),
-            "serum": (20, 150),
-            "fragrance": (30, 300),
-            "gift set": (30, 200),
-            "default": (5, 200),
-        }
-
-        # Find matching product type
-        product_lower = product_type.lower()
-        expected_range = PRICE_RANGES["default"]
-
-        for key, range_val in PRICE_RANGES.items():
-            if key in product_lower:
-                expected_range = range_val
-                break
-
-        min_price, max_price = expected_range
+        min_price, max_price = _expected_price_range(product_type)
 
+        # Messages are only formatted on the failing branches
         if price < min_price:
             return (
                 False,
@@ -235,44 +480,10 @@ class MSRPLookup:
 
         These are conservative minimums - actual MSRP is often higher.
         """
-        product_lower = product_type.lower()
-
-        # Check specific patterns first (order matters!)
-        # More specific → less specific
-        PRICE_MINIMUMS = [
-            ("mud mask", 24),  # Mud masks $24-35
-            ("sheet mask", 15),  # Sheet masks $15-25
-            ("face mask", 22),  # Face masks $22-40
-            ("mask", 20),  # Generic masks $20+
-            ("lip liner", 14),  # Premium lip liners $14-25
-            ("lip gloss", 14),  # Lip gloss $14-28
-            ("lipstick", 14),  # Premium lipsticks $14-40
-            ("lip", 14),  # Generic lip products $14+
-            ("foundation", 25),  # Premium foundations $25-60
-            ("mascara", 14),  # Premium mascara $14-30
-            ("eyeshadow", 18),  # Premium eyeshadow $18-50
-            ("cleanser", 18),  # Premium cleansers $18-45
-            ("moisturizer", 22),  # Premium moisturizers $22-80
-            ("serum", 30),  # Serums $30-150
-            ("eau de parfum", 60),  # EDP $60-200
-            ("eau de toilette", 45),  # EDT $45-150
-            ("fragrance", 50),  # Fragrances $50-200
-            ("perfume", 50),  # Perfumes $50-200
-            ("cologne", 45),  # Cologne $45-150
-            ("gift set", 45),  # Gift sets $45-200
-            ("palette", 25),  # Makeup palettes $25-65
-            ("primer", 20),  # Primers $20-45
-            ("concealer", 16),  # Concealers $16-35
-            ("blush", 18),  # Blush $18-40
-            ("bronzer", 20),  # Bronzer $20-45
-            ("highlighter", 20),  # Highlighter $20-45
-            ("setting spray", 18),  # Setting sprays $18-35
-            ("setting powder", 20),  # Setting powder $20-40
-        ]
-
-        for pattern, min_price in PRICE_MINIMUMS:
-            if pattern in product_lower:
-                return float(min_price)
+        # Earliest-listed (most specific) type name found in the text
+        match = _match_min_price_type(product_type.lower())
+        if match:
+            return float(_MIN_PRICES[match])
 
         # Default minimum for unknown beauty products
         return 15.0
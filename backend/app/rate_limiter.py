@@ -2,13 +2,12 @@
 Simple rate limiter for web crawling.
 """
 import asyncio
-from datetime import datetime, timedelta
-from collections import deque
+import time
 from typing import Dict
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RateLimitConfig:
     """Rate limit configuration for a domain."""
     
@@ -19,9 +18,11 @@ class RateLimitConfig:
 class DomainRateLimiter:
     """Rate limiter for a single domain."""
     
+    __slots__ = ("config", "last_request", "semaphore")
+    
     def __init__(self, config: RateLimitConfig) -> None:
         self.config = config
-        self.last_request: datetime | None = None
+        self.last_request: float | None = None  # time.monotonic()
         self.semaphore = asyncio.Semaphore(config.max_concurrent)
     
     async def acquire(self) -> None:
@@ -29,19 +30,31 @@ class DomainRateLimiter:
         await self.semaphore.acquire()
         
         # Enforce per-second rate limit
-        if self.last_request:
-            time_since_last = (datetime.now() - self.last_request).total_seconds()
+        if self.last_request is not None:
+            time_since_last = time.monotonic() - self.last_request
             min_interval = 1.0 / self.config.requests_per_second
             
             if time_since_last < min_interval:
                 wait_time = min_interval - time_since_last
-                await asyncio.sleep(wait_time)
+                try:
+                    await asyncio.sleep(wait_time)
+                except BaseException:
+                    # Cancelled (e.g. crawler timeout) - don't leak the slot
+                    self.semaphore.release()
+                    raise
         
-        self.last_request = datetime.now()
+        self.last_request = time.monotonic()
     
     def release(self) -> None:
         """Release the semaphore."""
         self.semaphore.release()
+    
+    async def __aenter__(self) -> "DomainRateLimiter":
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.release()
 
 
 class GlobalRateLimiter:
@@ -56,13 +69,17 @@ class GlobalRateLimiter:
             'ulta.com': RateLimitConfig(requests_per_second=1.0, max_concurrent=2),
             'google.com': RateLimitConfig(requests_per_second=0.2, max_concurrent=1),
         }
+        self._default_config = RateLimitConfig()
+        
+        # Known domains get their limiter up front; others are added on first use
+        for domain, config in self.configs.items():
+            self.limiters[domain] = DomainRateLimiter(config)
     
     def get_limiter(self, domain: str) -> DomainRateLimiter:
         """Get or create rate limiter for domain."""
-        if domain not in self.limiters:
-            config = self.configs.get(domain, RateLimitConfig())
-            self.limiters[domain] = DomainRateLimiter(config)
-        return self.limiters[domain]
+        return self.limiters.get(domain) or self.limiters.setdefault(
+            domain, DomainRateLimiter(self._default_config)
+        )
 
 
 # Global instance
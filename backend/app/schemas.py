@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation.
 """
 from typing import Optional, Dict, List
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class ProductInput(BaseModel):
@@ -14,18 +14,21 @@ class ProductInput(BaseModel):
     size: Optional[str] = Field(None, max_length=100, description="Product size (e.g., '30ml', '1 fl oz')")
     color: Optional[str] = Field(None, max_length=100, description="Product color/shade (e.g., '#190', 'On the Rose')")
     
-    @field_validator('upc')
+    @field_validator('upc', mode='after')
     @classmethod
     def validate_upc(cls, v: str) -> str:
         """Validate UPC format (digits only)."""
+        # Length first: it's O(1), the digit scan isn't
+        if len(v) not in (8, 12, 13):  # UPC-A (12), UPC-E (8), EAN-13 (13)
+            raise ValueError('UPC must be 8, 12, or 13 digits')
         if not v.isdigit():
             raise ValueError('UPC must contain only digits')
-        if len(v) not in [8, 12, 13]:  # UPC-A (12), UPC-E (8), EAN-13 (13)
-            raise ValueError('UPC must be 8, 12, or 13 digits')
         return v
     
-    class Config:
-        json_schema_extra = {
+    # Request data is never mutated; frozen also makes instances hashable
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "name": "No Pressure Lip Liner - #1 - On the Rose",
                 "upc": "850029397809",
@@ -34,6 +37,7 @@ class ProductInput(BaseModel):
                 "color": "#1 - On the Rose"
             }
         }
+    )
 
 
 class CrawlSource(BaseModel):
@@ -60,8 +64,8 @@ class VerificationInfo(BaseModel):
     color_match: bool = Field(..., description="Whether color/shade matches")
     mismatches: List[str] = Field(default_factory=list, description="List of mismatched attributes")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "is_exact_match": True,
                 "brand_match": True,
@@ -70,6 +74,7 @@ class VerificationInfo(BaseModel):
                 "mismatches": []
             }
         }
+    )
 
 
 class ImageVerificationInfo(BaseModel):
@@ -85,8 +90,8 @@ class ImageVerificationInfo(BaseModel):
     product_detected: bool = Field(..., description="Whether product type was detected")
     reasoning: str = Field(..., description="Explanation of image verification")
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "is_verified": True,
                 "confidence": 85,
@@ -95,6 +100,7 @@ class ImageVerificationInfo(BaseModel):
                 "reasoning": "Image matches 'DIBS Beauty Lip Liner' with 85% confidence"
             }
         }
+    )
 
 
 class ProductOutput(BaseModel):
@@ -129,8 +135,8 @@ class ProductOutput(BaseModel):
         description="AI-powered image verification using CLIP model"
     )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "upc": "850029397809",
                 "brand": "DIBS Beauty",
@@ -155,6 +161,7 @@ class ProductOutput(BaseModel):
                 }
             }
         }
+    )
 
 
 class ErrorResponse(BaseModel):
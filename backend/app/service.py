@@ -2,10 +2,18 @@
 Product enrichment service.
 """
 
-from typing import Optional
-from sqlalchemy import select
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.models import EnrichedProduct
 from app.schemas import (
     ProductInput,
@@ -16,6 +24,56 @@ from app.schemas import (
 )
 from app.crawlers.manager import CrawlerManager, aggregate_crawl_results
 from app.image_client import image_client
+from app.image_fetcher import image_fetcher
+from app.msrp_lookup import msrp_lookup
+
+
+log = logging.getLogger(__name__)
+
+# Validates a whole sources list in one call instead of CrawlSource(**s) per item
+_SOURCES_ADAPTER = TypeAdapter(List[CrawlSource])
+
+# Whole words marking a gift set / bundle (so "kitten" or "sunset" don't count)
+_GIFT_SET_WORDS = frozenset(
+    {"gift", "gifts", "giftset", "set", "sets", "kit", "kits", "duo", "trio"}
+)
+_WORD_RE = re.compile(r"\w+")
+
+# Process-local cache of DB hits, in front of Postgres
+_UPC_CACHE_SIZE = 10_000
+_UPC_CACHE_TTL = 300.0
+
+
+class _UPCCache:
+    """Small LRU + TTL map of UPC -> ProductOutput built from a DB row."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ProductOutput]]" = OrderedDict()
+
+    def get(self, upc: str) -> Optional[ProductOutput]:
+        entry = self._entries.get(upc)
+        if entry is None:
+            return None
+        expires_at, output = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[upc]
+            return None
+        self._entries.move_to_end(upc)
+        return output
+
+    def set(self, upc: str, output: ProductOutput) -> None:
+        self._entries[upc] = (time.monotonic() + self.ttl, output)
+        self._entries.move_to_end(upc)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, upc: str) -> None:
+        self._entries.pop(upc, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
 
 
 class EnrichmentService:
@@ -23,6 +81,7 @@ class EnrichmentService:
 
     def __init__(self) -> None:
         self.crawler_manager = CrawlerManager()
+        self._upc_cache = _UPCCache(_UPC_CACHE_SIZE, _UPC_CACHE_TTL)
 
     async def enrich_product(
         self, product_input: ProductInput, db: AsyncSession
@@ -37,23 +96,115 @@ class EnrichmentService:
         6. Return enriched data
         """
 
-        # Step 1: Check database
+        # Step 1: Check database (recent hits are served from memory)
+        cached = self._upc_cache.get(product_input.upc)
+        if cached is not None:
+            return cached
+
         existing = await self._get_from_db(product_input.upc, db)
         if existing:
-            print(f"[DB] Cache hit for UPC {product_input.upc}")
-            return self._db_to_output(existing)
+            log.debug("[DB] Cache hit for UPC %s", product_input.upc)
+            output = self._db_to_output(existing)
+            self._upc_cache.set(product_input.upc, output)
+            return output
+
+        log.debug("[DB] Cache miss for UPC %s, crawling...", product_input.upc)
+
+        output, to_save = await self._crawl_and_enrich(product_input)
+        if to_save is not None:
+            await self._save_to_db(product_input, to_save, db)
+        return output
+
+    async def enrich_products_batch(
+        self, product_inputs: Sequence[ProductInput], db: AsyncSession
+    ) -> List[ProductOutput]:
+        """
+        Enrich several products, in input order.
+
+        Cached UPCs are fetched with one SELECT ... IN, and the misses are
+        crawled concurrently (at most BATCH_CRAWL_CONCURRENCY at a time).
+        DB writes stay sequential since they share a session. Repeated UPCs
+        are enriched once. A product whose crawl fails gets a zero-confidence
+        output instead of failing the whole batch.
+        """
+        outputs: Dict[str, ProductOutput] = {}
+        for product_input in product_inputs:
+            cached = self._upc_cache.get(product_input.upc)
+            if cached is not None:
+                outputs[product_input.upc] = cached
+
+        lookup = list(
+            dict.fromkeys(p.upc for p in product_inputs if p.upc not in outputs)
+        )
+        for upc, existing in (await self._get_many_from_db(lookup, db)).items():
+            output = self._db_to_output(existing)
+            self._upc_cache.set(upc, output)
+            outputs[upc] = output
+
+        misses = list(
+            {p.upc: p for p in product_inputs if p.upc not in outputs}.values()
+        )
+        if misses:
+            log.debug("[DB] Cache miss for %d UPC(s), crawling...", len(misses))
+
+        # Each crawl fans out to several retailers, so bound how many run
+        # at once rather than starting the whole catalog together
+        semaphore = asyncio.Semaphore(settings.BATCH_CRAWL_CONCURRENCY)
+
+        async def crawl(
+            product_input: ProductInput,
+        ) -> Tuple[ProductOutput, Optional[dict]]:
+            async with semaphore:
+                return await self._crawl_and_enrich(product_input)
+
+        enriched = await asyncio.gather(
+            *(crawl(p) for p in misses), return_exceptions=True
+        )
+        for product_input, result in zip(misses, enriched):
+            if isinstance(result, Exception):
+                log.warning(
+                    "[Batch] Enrichment failed for UPC %s: %s", product_input.upc, result
+                )
+                outputs[product_input.upc] = self._failed_output(product_input, result)
+                continue
+            if isinstance(result, BaseException):
+                raise result
+
+            output, to_save = result
+            if to_save is not None:
+                await self._save_to_db(product_input, to_save, db)
+            outputs[product_input.upc] = output
 
-        print(f"[DB] Cache miss for UPC {product_input.upc}, crawling...")
+        return [outputs[p.upc] for p in product_inputs]
 
-        # Step 2: Crawl retailers (with fallback to brand+name search)
-        crawl_results = await self.crawler_manager.search_all(
+    @staticmethod
+    def _failed_output(product_input: ProductInput, error: Exception) -> ProductOutput:
+        """Zero-confidence output for a batch item whose enrichment raised."""
+        return ProductOutput(
             upc=product_input.upc,
             brand=product_input.brand_name,
             product_name=product_input.name,
+            size=product_input.size,
+            color=product_input.color,
+            msrp=None,
+            image_url=None,
+            description=None,
+            confidence_score=0,
+            reasoning=f"Enrichment failed: {error}",
+            sources=[],
+            verification=None,
+            image_verification=None,
         )
 
-        # Step 3: Aggregate results WITH VERIFICATION
-        # This is critical - we verify brand, size, and color match exactly
+    async def _crawl_and_enrich(
+        self, product_input: ProductInput
+    ) -> Tuple[ProductOutput, Optional[dict]]:
+        """
+        Steps 2-5 of enrich_product (no DB access).
+
+        Returns the output, plus the aggregated data to save when the
+        result is verified with high enough confidence (otherwise None).
+        """
 
         # Normalize "null" strings to None (frontend may send "null" as string)
         input_size = (
@@ -67,96 +218,58 @@ class EnrichmentService:
             else None
         )
 
-        aggregated = aggregate_crawl_results(
-            results=crawl_results,
-            input_upc=product_input.upc,
-            input_brand=product_input.brand_name,
-            input_name=product_input.name,
-            input_size=input_size,
-            input_color=input_color,
-        )
-
-        # Step 4: Fetch image if missing
-        from app.image_fetcher import image_fetcher
-
-        image_url = aggregated.get("image_url")
-        if not image_url:
-            print(f"[ImageFetcher] No image found, searching...")
-
-            # Check if this is a gift set (harder to find)
-            is_gift_set = any(
-                word in product_input.name.lower()
-                for word in ["gift", "set", "kit", "duo", "trio"]
+        # Let the image service encode the CLIP text prompts while we crawl
+        prewarm = asyncio.create_task(
+            image_client.prewarm_text_embedding(
+                expected_brand=product_input.brand_name,
+                expected_product=product_input.name,
+                expected_color=input_color,
+                expected_size=input_size,
             )
-
-            if is_gift_set:
-                image_url = await image_fetcher.fetch_image_for_gift_set(
-                    brand=product_input.brand_name,
-                    product_name=product_input.name,
-                    upc=product_input.upc,
-                )
-            else:
-                image_url = await image_fetcher.fetch_image(
-                    brand=product_input.brand_name,
-                    product_name=product_input.name,
-                    existing_url=None,
-                )
-
-            if image_url:
-                print(f"[ImageFetcher] Found image: {image_url[:60]}...")
-                aggregated["image_url"] = image_url
-            else:
-                print(f"[ImageFetcher] Could not find image")
-
-        # Step 4b: Validate/improve MSRP - enforce minimum price floor
-        # But trust UPC database prices (they're authoritative)
-        from app.msrp_lookup import msrp_lookup
-
-        current_msrp = aggregated.get("msrp")
-
-        # Check if we have a UPC-verified price (most reliable)
-        has_upc_price = any(
-            s.get("found_upc", False) for s in aggregated.get("sources", [])
         )
 
-        # Get minimum expected price for this product type
-        min_expected = msrp_lookup.get_min_expected_price(product_input.name)
+        try:
+            # Step 2: Crawl retailers (with fallback to brand+name search)
+            crawl_results = await self.crawler_manager.search_all(
+                upc=product_input.upc,
+                brand=product_input.brand_name,
+                product_name=product_input.name,
+            )
 
-        # Only apply floor if:
-        # 1. No UPC-verified price (UPC prices are authoritative)
-        # 2. Current price is suspiciously low
-        if (
-            current_msrp
-            and min_expected
-            and current_msrp < min_expected
-            and not has_upc_price
-        ):
-            print(
-                f"[MSRP] Price ${current_msrp:.2f} below minimum ${min_expected:.2f} for product type"
+            # Step 3: Aggregate results WITH VERIFICATION
+            # This is critical - we verify brand, size, and color match exactly
+
+            # Verification is CPU-bound regex work over every result; run the
+            # whole batch in one worker thread so the event loop keeps serving
+            # other requests meanwhile.
+            aggregated = await asyncio.to_thread(
+                aggregate_crawl_results,
+                results=crawl_results,
+                input_upc=product_input.upc,
+                input_brand=product_input.brand_name,
+                input_name=product_input.name,
+                input_size=input_size,
+                input_color=input_color,
             )
-            print(f"[MSRP] Searching authoritative retailers...")
 
-            # Try to find better price from authoritative sources
-            better_msrp, source = await msrp_lookup.lookup_msrp(
-                brand=product_input.brand_name,
-                product_name=product_input.name,
-                current_prices=[current_msrp],
+            # Step 4: Fetch image if missing, and validate/improve MSRP.
+            # Both only depend on the aggregated crawl result and are
+            # network-bound, so run them concurrently.
+            await asyncio.gather(
+                self._fill_missing_image(product_input, aggregated),
+                self._enforce_msrp_floor(product_input, aggregated),
             )
 
-            if better_msrp and better_msrp >= min_expected:
-                print(f"[MSRP] Found better price: ${better_msrp:.2f} from {source}")
-                aggregated["msrp"] = better_msrp
-            else:
-                # Use minimum expected price as floor
-                print(f"[MSRP] Using minimum expected price: ${min_expected:.2f}")
-                aggregated["msrp"] = min_expected
-        elif has_upc_price:
-            print(f"[MSRP] Trusting UPC database price: ${current_msrp:.2f}")
+        finally:
+            # The prewarm is only a head start: /verify-image encodes any
+            # prompt it's missing itself, so never wait on it. Cancelling is
+            # a no-op if it already finished.
+            prewarm.cancel()
 
         # Step 5: Verify image using AI (if we have an image)
         image_verification = None
         if aggregated.get("image_url"):
-            print(f"[AI] Verifying image with CLIP: {aggregated['image_url'][:50]}...")
+            log.debug("[AI] Verifying image with CLIP: %.50s...", aggregated["image_url"])
             image_result = await image_client.verify_image(
                 image_url=aggregated["image_url"],
                 expected_brand=product_input.brand_name,
@@ -173,11 +286,13 @@ class EnrichmentService:
                 reasoning=image_result.reasoning,
             )
 
-            print(
-                f"[AI] Image verification: verified={image_result.is_verified}, confidence={image_result.confidence}%"
+            log.debug(
+                "[AI] Image verification: verified=%s, confidence=%s%%",
+                image_result.is_verified,
+                image_result.confidence,
             )
 
-        # Step 5: Save to DB only if high confidence AND verified
+        # Step 5: Save to DB (by the caller) only if high confidence AND verified
         verification = aggregated.get("verification")
         is_verified = verification and verification.get("is_exact_match", False)
 
@@ -192,11 +307,10 @@ class EnrichmentService:
             ):
                 final_confidence = max(0, final_confidence - 10)  # Reduce
 
-        if final_confidence >= 85 and is_verified:
-            await self._save_to_db(product_input, aggregated, db)
+        to_save = aggregated if final_confidence >= 85 and is_verified else None
 
         # Step 6: Return output
-        return ProductOutput(
+        output = ProductOutput(
             upc=product_input.upc,
             brand=product_input.brand_name,
             product_name=product_input.name,
@@ -207,10 +321,97 @@ class EnrichmentService:
             description=aggregated["description"],
             confidence_score=final_confidence,
             reasoning=aggregated["reasoning"],
-            sources=[CrawlSource(**source) for source in aggregated["sources"]],
-            verification=VerificationInfo(**verification) if verification else None,
+            sources=_SOURCES_ADAPTER.validate_python(aggregated["sources"]),
+            verification=(
+                VerificationInfo.model_validate(verification) if verification else None
+            ),
             image_verification=image_verification,
         )
+        return output, to_save
+
+    async def _fill_missing_image(
+        self, product_input: ProductInput, aggregated: dict
+    ) -> None:
+        """Search for an image when no crawler returned one."""
+        if aggregated.get("image_url"):
+            return
+
+        log.debug("[ImageFetcher] No image found, searching...")
+
+        # Check if this is a gift set (harder to find)
+        is_gift_set = not _GIFT_SET_WORDS.isdisjoint(
+            _WORD_RE.findall(product_input.name.lower())
+        )
+
+        if is_gift_set:
+            image_url = await image_fetcher.fetch_image_for_gift_set(
+                brand=product_input.brand_name,
+                product_name=product_input.name,
+                upc=product_input.upc,
+            )
+        else:
+            image_url = await image_fetcher.fetch_image(
+                brand=product_input.brand_name,
+                product_name=product_input.name,
+                existing_url=None,
+            )
+
+        if image_url:
+            log.debug("[ImageFetcher] Found image: %.60s...", image_url)
+            aggregated["image_url"] = image_url
+        else:
+            log.debug("[ImageFetcher] Could not find image")
+
+    async def _enforce_msrp_floor(
+        self, product_input: ProductInput, aggregated: dict
+    ) -> None:
+        """
+        Enforce the minimum price floor for the product type.
+
+        UPC database prices are trusted as-is (they're authoritative).
+        """
+        current_msrp = aggregated.get("msrp")
+
+        # Check if we have a UPC-verified price (most reliable)
+        has_upc_price = any(
+            s.get("found_upc", False) for s in aggregated.get("sources", [])
+        )
+
+        # Get minimum expected price for this product type
+        min_expected = msrp_lookup.get_min_expected_price(product_input.name)
+
+        # Only apply floor if:
+        # 1. No UPC-verified price (UPC prices are authoritative)
+        # 2. Current price is suspiciously low
+        if (
+            current_msrp
+            and min_expected
+            and current_msrp < min_expected
+            and not has_upc_price
+        ):
+            log.debug(
+                "[MSRP] Price $%.2f below minimum $%.2f for product type",
+                current_msrp,
+                min_expected,
+            )
+            log.debug("[MSRP] Searching authoritative retailers...")
+
+            # Try to find better price from authoritative sources
+            better_msrp, source = await msrp_lookup.lookup_msrp(
+                brand=product_input.brand_name,
+                product_name=product_input.name,
+                current_prices=[current_msrp],
+            )
+
+            if better_msrp and better_msrp >= min_expected:
+                log.debug("[MSRP] Found better price: $%.2f from %s", better_msrp, source)
+                aggregated["msrp"] = better_msrp
+            else:
+                # Use minimum expected price as floor
+                log.debug("[MSRP] Using minimum expected price: $%.2f", min_expected)
+                aggregated["msrp"] = min_expected
+        elif has_upc_price:
+            log.debug("[MSRP] Trusting UPC database price: $%.2f", current_msrp)
 
     async def _get_from_db(
         self, upc: str, db: AsyncSession
@@ -220,37 +421,64 @@ class EnrichmentService:
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def _get_many_from_db(
+        self, upcs: Sequence[str], db: AsyncSession
+    ) -> Dict[str, EnrichedProduct]:
+        """Get existing products for several UPCs in one query."""
+        if not upcs:
+            return {}
+        stmt = select(EnrichedProduct).where(EnrichedProduct.upc.in_(upcs))
+        result = await db.execute(stmt)
+        return {product.upc: product for product in result.scalars()}
+
     async def _save_to_db(
         self, product_input: ProductInput, aggregated: dict, db: AsyncSession
     ) -> None:
-        """Save enriched product to database."""
+        """
+        Save enriched product to database.
 
-        product = EnrichedProduct(
-            upc=product_input.upc,
-            brand=product_input.brand_name,
-            product_name=product_input.name,
-            size=product_input.size,
-            color=product_input.color,
-            msrp=aggregated["msrp"],
-            image_url=aggregated["image_url"],
-            description=aggregated["description"],
-            confidence_score=aggregated["confidence"],
-            sources={"sources": aggregated["sources"]},
-            source_count=len(aggregated["sources"]),
+        Upserts on UPC, so two concurrent misses for the same product
+        don't fail on the unique constraint; the later one wins.
+        """
+        values = {
+            "upc": product_input.upc,
+            "brand": product_input.brand_name,
+            "product_name": product_input.name,
+            "size": product_input.size,
+            "color": product_input.color,
+            "msrp": aggregated["msrp"],
+            "image_url": aggregated["image_url"],
+            "description": aggregated["description"],
+            "confidence_score": aggregated["confidence"],
+            "sources": aggregated["sources"],
+            "source_count": len(aggregated["sources"]),
+        }
+
+        stmt = insert(EnrichedProduct).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EnrichedProduct.upc],
+            set_={
+                **{key: stmt.excluded[key] for key in values if key != "upc"},
+                "updated_at": func.now(),
+            },
         )
-
-        db.add(product)
-        await db.commit()
-        print(
-            f"[DB] Saved UPC {product_input.upc} with confidence {aggregated['confidence']} (VERIFIED)"
+        # get_db commits the transaction
+        await db.execute(stmt)
+        self._upc_cache.invalidate(product_input.upc)
+        log.debug(
+            "[DB] Saved UPC %s with confidence %s (VERIFIED)",
+            product_input.upc,
+            aggregated["confidence"],
         )
 
     def _db_to_output(self, product: EnrichedProduct) -> ProductOutput:
         """Convert database model to output schema."""
 
-        # Extract sources from JSON
-        sources_data = product.sources.get("sources", [])
-        sources = [CrawlSource(**s) for s in sources_data]
+        # Extract sources from JSON (older rows wrap them in {"sources": ...})
+        sources_data = product.sources
+        if isinstance(sources_data, dict):
+            sources_data = sources_data.get("sources", [])
+        sources = _SOURCES_ADAPTER.validate_python(sources_data)
 
         return ProductOutput(
             upc=product.upc,
@@ -258,7 +486,7 @@ class EnrichmentService:
             product_name=product.product_name,
             size=product.size,
             color=product.color,
-            msrp=float(product.msrp) if product.msrp else None,
+            msrp=product.msrp or None,
             image_url=product.image_url,
             description=product.description,
             confidence_score=product.confidence_score,
@@ -274,6 +502,10 @@ class EnrichmentService:
             image_verification=None,  # Not stored in cache, would need re-verification
         )
 
+    def clear_cache(self) -> None:
+        """Drop in-memory DB hits (call after deleting cached rows)."""
+        self._upc_cache.clear()
+
     async def close(self) -> None:
         """Cleanup resources."""
         await self.crawler_manager.close_all()
@@ -0,0 +1,56 @@
+"""
+GS1 check-digit validation for UPC/EAN codes.
+
+Used to reject mistyped codes before any crawler spends network I/O on them.
+"""
+
+
+def _gs1_check_digit(body: str) -> int:
+    """
+    Compute the GS1 mod-10 check digit for the given digits.
+
+    Weights alternate 3,1,3,1,... starting from the rightmost digit.
+    """
+    total = 0
+    weight = 3
+    for ch in reversed(body):
+        total += (ord(ch) - 48) * weight
+        weight = 4 - weight  # 3 <-> 1
+    return (10 - total % 10) % 10
+
+
+def _expand_upc_e(upc: str) -> str:
+    """Expand an 8-digit UPC-E code (with check digit) to its UPC-A form."""
+    number_system, d, check = upc[0], upc[1:7], upc[7]
+    last = d[5]
+
+    if last in "012":
+        body = d[0:2] + last + "0000" + d[2:5]
+    elif last == "3":
+        body = d[0:3] + "00000" + d[3:5]
+    elif last == "4":
+        body = d[0:4] + "00000" + d[4]
+    else:
+        body = d[0:5] + "0000" + last
+
+    return number_system + body + check
+
+
+def is_valid_upc(upc: str) -> bool:
+    """
+    Check that a UPC-A (12), EAN-13 (13) or 8-digit code has a valid
+    check digit.
+
+    8-digit codes are accepted as either EAN-8 or UPC-E.
+    """
+    if not upc.isascii() or not upc.isdigit() or len(upc) not in (8, 12, 13):
+        return False
+
+    if _gs1_check_digit(upc[:-1]) == ord(upc[-1]) - 48:
+        return True
+
+    if len(upc) == 8 and upc[0] in "01":
+        upc_a = _expand_upc_e(upc)
+        return _gs1_check_digit(upc_a[:-1]) == ord(upc_a[-1]) - 48
+
+    return False
@@ -10,11 +10,71 @@ This is critical for wholesale buyers who need exact SKU matches.
 """
 
 import re
-from typing import Optional, Dict, List, Tuple
+from functools import lru_cache
+from typing import Optional, Dict, List, Match, Pattern, Sequence, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+# Everything except digits and "." (size strings -> "30", "1.7")
+_NON_NUMERIC_RE = re.compile(r"[^\d.]")
+
+# Shade number in a user-supplied color, e.g. "#1 - On the Rose" -> "1"
+_SHADE_NUMBER_RE = re.compile(r"#?(\d+)")
+
+# Filler removed before comparing color names. Matched anywhere (not just
+# as whole words), like the chained str.replace() calls it replaces.
+_COLOR_STOP_RE = re.compile(r"the|in|shade|color|-|#")
+
+
+@lru_cache(maxsize=4096)
+def _brand_pattern(variations: Tuple[str, ...]) -> Pattern[str]:
+    """One literal alternation that matches if any variation is a substring."""
+    return re.compile("|".join(map(re.escape, dict.fromkeys(variations))))
+
+
+class _PriorityPatterns:
+    """
+    An ordered list of regexes searched in a single pass.
+
+    search() returns what the loop "first pattern (in list order) whose
+    search() matches" would, without scanning the text once per pattern.
+    Every pattern is tried at each position inside one lookahead
+    alternation, so earlier patterns win at a position and the lowest
+    pattern index seen anywhere wins overall.
+    """
+
+    __slots__ = ("patterns", "_combined")
+
+    def __init__(self, patterns: Sequence[Pattern[str]]) -> None:
+        self.patterns = tuple(patterns)
+        self._combined = re.compile(
+            "(?="
+            + "|".join(f"(?P<p{i}>{p.pattern})" for i, p in enumerate(self.patterns))
+            + ")",
+            re.IGNORECASE,
+        )
+
+    def search(self, text: str) -> Optional[Tuple[int, Match[str]]]:
+        """Return (pattern index, match) for the first listed pattern found."""
+        best_index = len(self.patterns)
+        best_pos = -1
+        for m in self._combined.finditer(text):
+            index = int(m.lastgroup[1:])  # type: ignore[index]
+            if index < best_index:
+                best_index, best_pos = index, m.start()
+                if index == 0:
+                    break
+
+        if best_pos < 0:
+            return None
+
+        # Re-run the winning pattern alone to get its own groups
+        match = self.patterns[best_index].match(text, best_pos)
+        assert match is not None
+        return best_index, match
+
+
+@dataclass(frozen=True)
 class ExtractedAttributes:
     """Attributes extracted from a product title/description."""
 
@@ -27,7 +87,7 @@ class ExtractedAttributes:
     piece_count: Optional[int] = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class VerificationResult:
     """Result of verifying a product match."""
 
@@ -36,7 +96,8 @@ class VerificationResult:
     brand_match: bool
     size_match: bool
     color_match: bool
-    mismatches: List[str]
+    # Tuple, not list: verify_match results are lru_cached and shared
+    mismatches: Tuple[str, ...]
     reasoning: str
 
 
@@ -51,39 +112,52 @@ class ProductVerifier:
     - Gift set detection
     """
 
-    # Size patterns and conversions
-    SIZE_PATTERNS = [
+    # Size patterns and conversions (compiled once, case-insensitive)
+    SIZE_PATTERNS = (
         # Metric
-        (r"(\d+(?:\.\d+)?)\s*ml\b", "ml", 1.0),
-        (r"(\d+(?:\.\d+)?)\s*g\b", "g", 1.0),
-        (r"(\d+(?:\.\d+)?)\s*oz\b", "oz", 29.5735),  # Convert to ml
-        (r"(\d+(?:\.\d+)?)\s*fl\.?\s*oz\b", "fl oz", 29.5735),
-        (r"(\d+(?:\.\d+)?)\s*L\b", "L", 1000.0),  # Convert to ml
+        (re.compile(r"(\d+(?:\.\d+)?)\s*ml\b", re.IGNORECASE), "ml", 1.0),
+        (re.compile(r"(\d+(?:\.\d+)?)\s*g\b", re.IGNORECASE), "g", 1.0),
+        (re.compile(r"(\d+(?:\.\d+)?)\s*oz\b", re.IGNORECASE), "oz", 29.5735),  # Convert to ml
+        (re.compile(r"(\d+(?:\.\d+)?)\s*fl\.?\s*oz\b", re.IGNORECASE), "fl oz", 29.5735),
+        (re.compile(r"(\d+(?:\.\d+)?)\s*L\b", re.IGNORECASE), "L", 1000.0),  # Convert to ml
         # Count-based
-        (r"(\d+)\s*(?:pairs?|pcs?|pieces?|count)\b", "count", None),
-        (r"(\d+)\s*x\s*(\d+(?:\.\d+)?)\s*(ml|g|oz)", "pack", None),
-    ]
+        (re.compile(r"(\d+)\s*(?:pairs?|pcs?|pieces?|count)\b", re.IGNORECASE), "count", None),
+        (re.compile(r"(\d+)\s*x\s*(\d+(?:\.\d+)?)\s*(ml|g|oz)", re.IGNORECASE), "pack", None),
+    )
 
     # Color/shade patterns
-    COLOR_PATTERNS = [
-        r"#(\d+)",  # #190, #1
-        r"shade\s*[#:]?\s*(\d+)",  # Shade 190, Shade: 190
-        r"shade\s*[#:]?\s*([a-zA-Z0-9\s\-]+)",  # Shade: On the Rose
-        r"color\s*[#:]?\s*([a-zA-Z0-9\s\-]+)",  # Color: Red
-        r"-\s*#(\d+)\s*-",  # - #1 -
-        r"in\s+([a-zA-Z0-9\s]+)\s*$",  # "in shade 190"
-    ]
+    COLOR_PATTERNS = tuple(
+        re.compile(pattern, re.IGNORECASE)
+        for pattern in (
+            r"#(\d+)",  # #190, #1
+            r"shade\s*[#:]?\s*(\d+)",  # Shade 190, Shade: 190
+            r"shade\s*[#:]?\s*([a-zA-Z0-9\s\-]+)",  # Shade: On the Rose
+            r"color\s*[#:]?\s*([a-zA-Z0-9\s\-]+)",  # Color: Red
+            r"-\s*#(\d+)\s*-",  # - #1 -
+            r"in\s+([a-zA-Z0-9\s]+)\s*$",  # "in shade 190"
+        )
+    )
 
     # Gift set indicators
-    GIFT_SET_PATTERNS = [
-        r"\bgift\s*set\b",
-        r"\bset\b",
-        r"\bkit\b",
-        r"\bduo\b",
-        r"\btrio\b",
-        r"(\d+)\s*(?:pc|piece|pcs)",
-    ]
+    GIFT_SET_PATTERNS = tuple(
+        re.compile(pattern, re.IGNORECASE)
+        for pattern in (
+            r"\bgift\s*set\b",
+            r"\bset\b",
+            r"\bkit\b",
+            r"\bduo\b",
+            r"\btrio\b",
+            r"(\d+)\s*(?:pc|piece|pcs)",
+        )
+    )
+
+    # Single-pass scanners over the lists above (same first-listed-wins result)
+    _SIZE_SCANNER = _PriorityPatterns([pattern for pattern, _, _ in SIZE_PATTERNS])
+    _COLOR_SCANNER = _PriorityPatterns(COLOR_PATTERNS)
+    _GIFT_SET_SCANNER = _PriorityPatterns(GIFT_SET_PATTERNS)
 
+    # Titles repeat across sources and requests (results are immutable)
+    @lru_cache(maxsize=4096)
     def extract_attributes(self, text: str) -> ExtractedAttributes:
         """
         Extract product attributes from title/description text.
@@ -120,50 +194,53 @@ class ProductVerifier:
 
     def _extract_size(self, text: str) -> Tuple[Optional[str], Optional[float]]:
         """Extract size/volume from text."""
-        for pattern, unit, multiplier in self.SIZE_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = match.group(1)
-                original = match.group(0)
-
-                if multiplier is not None:
-                    try:
-                        normalized = float(value) * multiplier
-                        return original, normalized
-                    except ValueError:
-                        pass
-
-                return original, None
+        found = self._SIZE_SCANNER.search(text)
+        if found:
+            index, match = found
+            _, unit, multiplier = self.SIZE_PATTERNS[index]
+            value = match.group(1)
+            original = match.group(0)
+
+            if multiplier is not None:
+                try:
+                    normalized = float(value) * multiplier
+                    return original, normalized
+                except ValueError:
+                    pass
+
+            return original, None
 
         return None, None
 
     def _extract_color(self, text: str) -> Tuple[Optional[str], Optional[str]]:
         """Extract color/shade from text."""
-        for pattern in self.COLOR_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                value = match.group(1).strip()
+        found = self._COLOR_SCANNER.search(text)
+        if found:
+            value = found[1].group(1).strip()
 
-                # Check if it's a number (shade number)
-                if value.isdigit():
-                    return None, value
-                else:
-                    return value, None
+            # Check if it's a number (shade number)
+            if value.isdigit():
+                return None, value
+            else:
+                return value, None
 
         return None, None
 
     def _detect_gift_set(self, text: str) -> Tuple[bool, Optional[int]]:
         """Detect if product is a gift set and extract piece count."""
-        for pattern in self.GIFT_SET_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                # Try to extract piece count
-                if match.lastindex and match.group(1).isdigit():
-                    return True, int(match.group(1))
-                return True, None
+        found = self._GIFT_SET_SCANNER.search(text)
+        if found:
+            match = found[1]
+            # Try to extract piece count
+            if match.lastindex and match.group(1).isdigit():
+                return True, int(match.group(1))
+            return True, None
 
         return False, None
 
+    # Several retailers often return the same catalog title/description for
+    # a SKU; identical inputs give identical results (which are immutable)
+    @lru_cache(maxsize=8192)
     def verify_match(
         self,
         input_brand: str,
@@ -173,6 +250,7 @@ class ProductVerifier:
         found_title: Optional[str],
         found_description: Optional[str],
         found_upc_match: bool = False,  # NEW: Did UPC match from source?
+        input_attrs: Optional[ExtractedAttributes] = None,
     ) -> VerificationResult:
         """
         Verify if a found product matches the input exactly.
@@ -188,6 +266,8 @@ class ProductVerifier:
             found_title: Title from crawled product
             found_description: Description from crawled product
             found_upc_match: Whether UPC was found on the source (authoritative!)
+            input_attrs: Precomputed extract_input_attributes() result, when
+                verifying many results against the same input
 
         Returns:
             VerificationResult with match status and confidence
@@ -210,7 +290,7 @@ class ProductVerifier:
                     brand_match=True,  # Trust UPC
                     size_match=True,
                     color_match=True,
-                    mismatches=[],
+                    mismatches=(),
                     reasoning="UPC matched - product verified by barcode",
                 )
             return VerificationResult(
@@ -219,18 +299,33 @@ class ProductVerifier:
                 brand_match=False,
                 size_match=False,
                 color_match=False,
-                mismatches=["No product information found"],
+                mismatches=("No product information found",),
                 reasoning="No product title or description available",
             )
 
+        # 1. Verify brand
+        brand_match = self._verify_brand(input_brand, found_text)
+
+        # UPC + brand match with no size/color to check: the outcome is
+        # already decided, so skip attribute extraction
+        if found_upc_match and brand_match and not input_size and not input_color:
+            return VerificationResult(
+                is_exact_match=True,
+                confidence=90,
+                brand_match=True,
+                size_match=True,
+                color_match=True,
+                mismatches=(),
+                reasoning="UPC verified",
+            )
+
         # Extract attributes from found product
         found_attrs = self.extract_attributes(found_text)
-        input_attrs = self.extract_attributes(
-            f"{input_name} {input_size or ''} {input_color or ''}"
-        )
+        if input_attrs is None:
+            input_attrs = self.extract_input_attributes(
+                input_name, input_size, input_color
+            )
 
-        # 1. Verify brand
-        brand_match = self._verify_brand(input_brand, found_text)
         if not brand_match:
             mismatches.append(f"Brand mismatch: expected '{input_brand}'")
 
@@ -273,7 +368,7 @@ class ProductVerifier:
                     brand_match=brand_match,
                     size_match=size_match,
                     color_match=color_match,
-                    mismatches=mismatches if not (size_match and color_match) else [],
+                    mismatches=tuple(mismatches) if not (size_match and color_match) else (),
                     reasoning=reasoning,
                 )
 
@@ -292,28 +387,35 @@ class ProductVerifier:
             brand_match=brand_match,
             size_match=size_match,
             color_match=color_match,
-            mismatches=mismatches,
+            mismatches=tuple(mismatches),
             reasoning=reasoning,
         )
 
+    def extract_input_attributes(
+        self,
+        input_name: str,
+        input_size: Optional[str],
+        input_color: Optional[str],
+    ) -> ExtractedAttributes:
+        """Extract attributes from the (already normalized) input fields."""
+        return self.extract_attributes(
+            f"{input_name} {input_size or ''} {input_color or ''}"
+        )
+
     def _verify_brand(self, expected_brand: str, found_text: str) -> bool:
         """Verify brand name matches."""
         expected_lower = expected_brand.lower().strip()
         found_lower = found_text.lower()
 
-        # Direct match
-        if expected_lower in found_lower:
-            return True
-
-        # Handle common variations
+        # Direct match or common variations, in a single scan
+        # (the brand itself is the first variation)
         brand_variations = self._get_brand_variations(expected_lower)
-        for variation in brand_variations:
-            if variation in found_lower:
-                return True
+        pattern = _brand_pattern(brand_variations)
+        return pattern.search(found_lower) is not None
 
-        return False
-
-    def _get_brand_variations(self, brand: str) -> List[str]:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _get_brand_variations(brand: str) -> Tuple[str, ...]:
         """Get common variations of a brand name."""
         variations = [brand]
 
@@ -330,7 +432,7 @@ class ProductVerifier:
         variations.append(brand.replace("-", " "))
         variations.append(brand.replace("-", ""))
 
-        return variations
+        return tuple(variations)
 
     def _verify_size(
         self, input_attrs: ExtractedAttributes, found_attrs: ExtractedAttributes
@@ -345,8 +447,8 @@ class ProductVerifier:
 
         # If both have raw sizes, compare strings
         if input_attrs.size and found_attrs.size:
-            input_size = re.sub(r"[^\d.]", "", input_attrs.size)
-            found_size = re.sub(r"[^\d.]", "", found_attrs.size)
+            input_size = _NON_NUMERIC_RE.sub("", input_attrs.size)
+            found_size = _NON_NUMERIC_RE.sub("", found_attrs.size)
             return input_size == found_size
 
         # If input has size but found doesn't, can't verify
@@ -370,7 +472,7 @@ class ProductVerifier:
         # Extract from input_color string if provided
         if input_color:
             # Check if input_color contains a shade number
-            shade_match = re.search(r"#?(\d+)", input_color)
+            shade_match = _SHADE_NUMBER_RE.search(input_color)
             if shade_match:
                 expected_shade = shade_match.group(1)
             else:
@@ -407,13 +509,8 @@ class ProductVerifier:
             return True
 
         # Remove common words and compare
-        stop_words = ["the", "in", "shade", "color", "-", "#"]
-        for word in stop_words:
-            expected_lower = expected_lower.replace(word, " ")
-            found_lower = found_lower.replace(word, " ")
-
-        expected_clean = " ".join(expected_lower.split())
-        found_clean = " ".join(found_lower.split())
+        expected_clean = " ".join(_COLOR_STOP_RE.sub(" ", expected_lower).split())
+        found_clean = " ".join(_COLOR_STOP_RE.sub(" ", found_lower).split())
 
         return expected_clean == found_clean
 
@@ -3,162 +3,292 @@
 Debug script to test crawlers and see what's happening.
 """
 import asyncio
+import io
+import os
+import random
+import re
+import sys
+from itertools import islice
+from typing import Dict, List, TextIO, Tuple
+from urllib.parse import quote
+
 import httpx
 
 
-async def debug_sephora(upc: str) -> None:
+# Dollar amounts in result pages ("$16", "$24.50"), matched on raw bytes
+_PRICE_RE = re.compile(rb'\$\d+\.?\d*')
+
+# Markers of a bot-block / challenge page, found in a single scan
+_BLOCK_MARKERS = ("captcha", "access denied", "robot", "challenge")
+_BLOCK_RE = re.compile("|".join(_BLOCK_MARKERS).encode(), re.IGNORECASE)
+
+# Sephora response headers worth printing (httpx lookups are case-insensitive)
+_REPORTED_HEADERS = ("content-type", "server", "cf-ray", "x-frame-options")
+
+# Blocked endpoints often just hang the handshake, so fail fast per
+# attempt and retry once rather than waiting out one long timeout
+_TIMEOUT = httpx.Timeout(connect=5.0, read=10.0, write=5.0, pool=5.0)
+_ATTEMPTS = 2
+
+# Test cases probed at once (each runs three requests)
+_MAX_CONCURRENT_CASES = 8
+
+# Dump each response to an HTML file only when asked (DEBUG_SAVE=1); the
+# dumps are several MB and usually go unread
+_SAVE = bool(os.environ.get("DEBUG_SAVE"))
+
+# Current desktop browsers, each with the client hints that browser really
+# sends (Firefox and Safari don't send Sec-CH-UA). A fixed UA on every
+# request is an easy fingerprint, so each probe picks one at random.
+_UA_POOL: Tuple[Tuple[str, Dict[str, str]], ...] = (
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+        {
+            "Sec-CH-UA": '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"',
+            "Sec-CH-UA-Mobile": "?0",
+            "Sec-CH-UA-Platform": '"Windows"',
+        },
+    ),
+    (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+        {
+            "Sec-CH-UA": '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"',
+            "Sec-CH-UA-Mobile": "?0",
+            "Sec-CH-UA-Platform": '"macOS"',
+        },
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0",
+        {
+            "Sec-CH-UA": '"Chromium";v="124", "Microsoft Edge";v="124", "Not-A.Brand";v="99"',
+            "Sec-CH-UA-Mobile": "?0",
+            "Sec-CH-UA-Platform": '"Windows"',
+        },
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
+        {},
+    ),
+    (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+        {},
+    ),
+)
+
+
+def _headers() -> Dict[str, str]:
+    """Browser-like request headers for a randomly chosen User-Agent."""
+    ua, client_hints = random.choice(_UA_POOL)
+    return {
+        "User-Agent": ua,
+        **client_hints,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        # "br" is only decoded when the brotli extra is installed
+        "Accept-Encoding": "gzip, deflate, br",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Upgrade-Insecure-Requests": "1",
+    }
+
+
+async def _fetch(
+    client: httpx.AsyncClient, url: str, headers: dict, save_as: str
+) -> Tuple[httpx.Response, bytes]:
+    """
+    Stream a GET response into memory, returning it with the raw body.
+
+    The body is kept as bytes (no str decode / re-encode round trip), and
+    the detector checks below run on it directly. With DEBUG_SAVE set it is
+    also written to `save_as`, off the event loop. A connect/read timeout
+    is retried once after a short backoff.
+    """
+    for attempt in range(_ATTEMPTS):
+        buf = bytearray()
+        try:
+            async with client.stream("GET", url, headers=headers) as response:
+                async for chunk in response.aiter_bytes(65536):
+                    buf.extend(chunk)
+            break
+        except (httpx.ConnectTimeout, httpx.ReadTimeout):
+            if attempt == _ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(0.5 * (attempt + 1))
+    content = bytes(buf)
+    if _SAVE:
+        await asyncio.to_thread(_write_file, save_as, content)
+    return response, content
+
+
+def _write_file(path: str, content: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def _first_prices(content: bytes, limit: int = 5) -> List[str]:
+    """First `limit` dollar amounts in the body; stops scanning once found."""
+    return [m.group(0).decode() for m in islice(_PRICE_RE.finditer(content), limit)]
+
+
+async def debug_sephora(
+    client: httpx.AsyncClient, upc: str, out: TextIO = sys.stdout
+) -> None:
     """Debug Sephora crawler to see what we're getting."""
     
-    print(f"🔍 Testing Sephora search for UPC: {upc}")
-    print("=" * 60)
+    print(f"🔍 Testing Sephora search for UPC: {upc}", file=out)
+    print("=" * 60, file=out)
     
     url = f"https://www.sephora.com/search?keyword={upc}"
-    print(f"URL: {url}\n")
+    print(f"URL: {url}\n", file=out)
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-        "Accept-Encoding": "gzip, deflate, br",
-        "DNT": "1",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-    }
+    headers = _headers()
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        try:
-            response = await client.get(url, headers=headers)
-            
-            print(f"Status Code: {response.status_code}")
-            print(f"Final URL: {response.url}")
-            print(f"Response Headers:")
-            for key, value in response.headers.items():
-                if key.lower() in ['content-type', 'server', 'cf-ray', 'x-frame-options']:
-                    print(f"  {key}: {value}")
-            
-            # Check for CloudFlare block
-            if 'cf-ray' in response.headers:
-                print("\n⚠️  CloudFlare detected!")
-            
-            # Check response content
-            content = response.text
-            print(f"\nResponse Length: {len(content)} bytes")
-            
-            # Check for common block indicators
-            if "captcha" in content.lower():
-                print("❌ CAPTCHA detected in response!")
-            if "access denied" in content.lower():
-                print("❌ Access Denied detected!")
-            if "robot" in content.lower():
-                print("❌ Robot detection triggered!")
-            if "challenge" in content.lower():
-                print("⚠️  Challenge page detected (likely JavaScript required)")
-            
-            # Save response for inspection
-            with open("debug_sephora_response.html", "w") as f:
-                f.write(content)
-            print("\n📄 Full response saved to: debug_sephora_response.html")
-            
-            # Check if we got actual product results
-            if "/product/" in content:
-                print("✅ Found product links in response!")
-                # Count how many
-                count = content.count("/product/")
-                print(f"   Found approximately {count} product references")
-            else:
-                print("❌ No product links found in response")
-            
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    try:
+        response, content = await _fetch(
+            client, url, headers, "debug_sephora_response.html"
+        )
+        
+        print(f"Status Code: {response.status_code}", file=out)
+        print(f"Final URL: {response.url}", file=out)
+        print(f"Response Headers:", file=out)
+        for key in _REPORTED_HEADERS:
+            value = response.headers.get(key)
+            if value is not None:
+                print(f"  {key}: {value}", file=out)
+        
+        # Check for CloudFlare block
+        if 'cf-ray' in response.headers:
+            print("\n⚠️  CloudFlare detected!", file=out)
+        
+        # Check response content
+        print(f"\nResponse Length: {len(content)} bytes", file=out)
+        
+        # Check for common block indicators (one pass, no lowercased copy)
+        markers = set()
+        for match in _BLOCK_RE.finditer(content):
+            markers.add(match.group(0).lower().decode())
+            if len(markers) == len(_BLOCK_MARKERS):
+                break
+        
+        if "captcha" in markers:
+            print("❌ CAPTCHA detected in response!", file=out)
+        if "access denied" in markers:
+            print("❌ Access Denied detected!", file=out)
+        if "robot" in markers:
+            print("❌ Robot detection triggered!", file=out)
+        if "challenge" in markers:
+            print("⚠️  Challenge page detected (likely JavaScript required)", file=out)
+        
+        if _SAVE:
+            print("\n📄 Full response saved to: debug_sephora_response.html", file=out)
+        
+        # Check if we got actual product results
+        # One count() pass doubles as the presence check
+        count = content.count(b"/product/")
+        if count:
+            print("✅ Found product links in response!", file=out)
+            print(f"   Found approximately {count} product references", file=out)
+        else:
+            print("❌ No product links found in response", file=out)
+        
+    except Exception as e:
+        print(f"❌ Error: {e}", file=out)
 
 
-async def debug_google_shopping(upc: str) -> None:
+async def debug_google_shopping(
+    client: httpx.AsyncClient, upc: str, out: TextIO = sys.stdout
+) -> None:
     """Debug Google Shopping search."""
     
-    print(f"\n🔍 Testing Google Shopping for UPC: {upc}")
-    print("=" * 60)
+    print(f"\n🔍 Testing Google Shopping for UPC: {upc}", file=out)
+    print("=" * 60, file=out)
     
     url = f"https://www.google.com/search?tbm=shop&q={upc}"
-    print(f"URL: {url}\n")
+    print(f"URL: {url}\n", file=out)
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
+    headers = _headers()
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        try:
-            response = await client.get(url, headers=headers)
-            
-            print(f"Status Code: {response.status_code}")
-            print(f"Final URL: {response.url}")
-            
-            content = response.text
-            print(f"Response Length: {len(content)} bytes")
-            
-            # Save response
-            with open("debug_google_response.html", "w") as f:
-                f.write(content)
-            print("📄 Full response saved to: debug_google_response.html")
-            
-            # Check for products
-            if "shopping" in content.lower() or "$" in content:
-                print("✅ Looks like shopping results!")
+    try:
+        response, content = await _fetch(
+            client, url, headers, "debug_google_response.html"
+        )
+        
+        print(f"Status Code: {response.status_code}", file=out)
+        print(f"Final URL: {response.url}", file=out)
+        
+        print(f"Response Length: {len(content)} bytes", file=out)
+        
+        if _SAVE:
+            print("📄 Full response saved to: debug_google_response.html", file=out)
+        
+        # Check for products
+        if b"shopping" in content.lower() or b"$" in content:
+            print("✅ Looks like shopping results!", file=out)
+        
+        # Look for price patterns
+        prices = _first_prices(content)
+        if prices:
+            print(f"✅ Found prices: {prices}...", file=out)
+        else:
+            print("❌ No prices found", file=out)
             
-            # Look for price patterns
-            import re
-            prices = re.findall(r'\$\d+\.?\d*', content)
-            if prices:
-                print(f"✅ Found prices: {prices[:5]}...")
-            else:
-                print("❌ No prices found")
-                
-        except Exception as e:
-            print(f"❌ Error: {e}")
-
-
-async def debug_direct_product_search(brand: str, product: str) -> None:
+    except Exception as e:
+        print(f"❌ Error: {e}", file=out)
+
+
+async def debug_direct_product_search(
+    client: httpx.AsyncClient, brand: str, product: str, out: TextIO = sys.stdout
+) -> None:
     """Try searching with brand + product name instead of UPC."""
     
     query = f"{brand} {product}"
-    print(f"\n🔍 Testing Google Shopping with brand+product: {query}")
-    print("=" * 60)
+    print(f"\n🔍 Testing Google Shopping with brand+product: {query}", file=out)
+    print("=" * 60, file=out)
     
-    import urllib.parse
-    url = f"https://www.google.com/search?tbm=shop&q={urllib.parse.quote(query)}"
-    print(f"URL: {url}\n")
+    url = f"https://www.google.com/search?tbm=shop&q={quote(query, safe='')}"
+    print(f"URL: {url}\n", file=out)
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.5",
-    }
+    headers = _headers()
     
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        try:
-            response = await client.get(url, headers=headers)
-            
-            print(f"Status Code: {response.status_code}")
-            
-            content = response.text
-            print(f"Response Length: {len(content)} bytes")
-            
-            # Save response
-            with open("debug_brand_search_response.html", "w") as f:
-                f.write(content)
-            print("📄 Full response saved to: debug_brand_search_response.html")
+    try:
+        response, content = await _fetch(
+            client, url, headers, "debug_brand_search_response.html"
+        )
+        
+        print(f"Status Code: {response.status_code}", file=out)
+        
+        print(f"Response Length: {len(content)} bytes", file=out)
+        
+        if _SAVE:
+            print("📄 Full response saved to: debug_brand_search_response.html", file=out)
+        
+        # Look for price patterns
+        prices = _first_prices(content)
+        if prices:
+            print(f"✅ Found prices: {prices}...", file=out)
+        else:
+            print("❌ No prices found", file=out)
             
-            # Look for price patterns
-            import re
-            prices = re.findall(r'\$\d+\.?\d*', content)
-            if prices:
-                print(f"✅ Found prices: {prices[:5]}...")
-            else:
-                print("❌ No prices found")
-                
-        except Exception as e:
-            print(f"❌ Error: {e}")
+    except Exception as e:
+        print(f"❌ Error: {e}", file=out)
+
+
+async def debug_test_case(
+    client: httpx.AsyncClient, upc: str, brand: str, product: str
+) -> None:
+    """Run all probes for one product concurrently, then print their reports."""
+    # Each probe writes to its own buffer so concurrent output doesn't interleave
+    buffers = [io.StringIO() for _ in range(3)]
+    await asyncio.gather(
+        debug_sephora(client, upc, out=buffers[0]),
+        debug_google_shopping(client, upc, out=buffers[1]),
+        debug_direct_product_search(client, brand, product, out=buffers[2]),
+    )
+    
+    header = "\n" + "=" * 70 + f"\nTESTING: {brand} - {product}\n" + "=" * 70 + "\n"
+    sys.stdout.write(header + "".join(b.getvalue() for b in buffers) + "\n\n\n")
 
 
 async def main():
@@ -168,16 +298,27 @@ async def main():
         ("850029397809", "DIBS Beauty", "No Pressure Lip Liner"),  # Easy
     ]
     
-    for upc, brand, product in test_cases:
-        print("\n" + "=" * 70)
-        print(f"TESTING: {brand} - {product}")
-        print("=" * 70)
+    # One client for every probe, so connections to Sephora/Google are
+    # reused across test cases instead of re-handshaking each time. HTTP/2
+    # lets the concurrent Google probes share one connection as streams.
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    ) as client:
+        # Probes are independent network calls, so run them concurrently,
+        # but only a few test cases at a time so a long list doesn't get
+        # the whole run Cloudflare-blocked
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_CASES)
         
-        await debug_sephora(upc)
-        await debug_google_shopping(upc)
-        await debug_direct_product_search(brand, product)
+        async def run_case(upc: str, brand: str, product: str) -> None:
+            async with semaphore:
+                await debug_test_case(client, upc, brand, product)
         
-        print("\n")
+        await asyncio.gather(
+            *(run_case(upc, brand, product) for upc, brand, product in test_cases)
+        )
 
 
 if __name__ == "__main__":
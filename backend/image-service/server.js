@@ -11,7 +11,15 @@
 
 import express from 'express';
 import cors from 'cors';
-import { pipeline, env } from '@xenova/transformers';
+import {
+    pipeline,
+    env,
+    AutoTokenizer,
+    AutoProcessor,
+    CLIPTextModelWithProjection,
+    CLIPVisionModelWithProjection,
+    RawImage,
+} from '@xenova/transformers';
 
 // Configure Transformers.js
 env.cacheDir = './.cache';
@@ -23,23 +31,59 @@ app.use(express.json());
 
 const PORT = process.env.PORT || 3001;
 
+// CLIP weight variants clients can pin via `model_version`.
+// "quantized" (int8 ONNX) is what Transformers.js v2 already loads by
+// default; it's spelled out so the two variants read side by side.
+// "fp32" opts into the full-precision export instead.
+const CLIP_MODEL_VERSIONS = {
+    quantized: { quantized: true },
+    fp32: { quantized: false },
+};
+const DEFAULT_CLIP_MODEL_VERSION = process.env.CLIP_MODEL_VERSION || 'quantized';
+
+const CLIP_MODEL_ID = 'Xenova/clip-vit-base-patch32';
+// Same prompt template and logit scale the zero-shot pipeline applies
+const CLIP_HYPOTHESIS_TEMPLATE = 'This is a photo of {}';
+const CLIP_LOGIT_SCALE = 100;
+
+// Text-tower embeddings, keyed by model version + candidate label.
+// The same brand/product prompts come up request after request, so each
+// is encoded once and only the image tower runs per verification.
+// Map insertion order doubles as LRU order.
+const TEXT_EMBEDDING_CACHE_SIZE = 20000;
+const textEmbeddingCache = new Map(); // `${version}\u0000${label}` -> Float32Array
+
 // Model instances (lazy loaded)
-let clipModel = null;
+const clipModels = new Map(); // model_version -> Promise<{ tokenizer, processor, textModel, visionModel }>
 let zeroShotClassifier = null;
 
 /**
- * Load CLIP model for image-text similarity
+ * Load CLIP text and vision towers for image-text similarity
  */
-async function getClipModel() {
-    if (!clipModel) {
-        console.log('🔄 Loading CLIP model (first time only)...');
-        clipModel = await pipeline(
-            'zero-shot-image-classification',
-            'Xenova/clip-vit-base-patch32'
-        );
-        console.log('✅ CLIP model loaded');
+async function getClipModel(version = DEFAULT_CLIP_MODEL_VERSION) {
+    const options = CLIP_MODEL_VERSIONS[version];
+    if (!options) {
+        throw new Error(`Unknown model_version: ${version}`);
+    }
+
+    if (!clipModels.has(version)) {
+        console.log(`🔄 Loading CLIP model [${version}] (first time only)...`);
+        // Cache the promise so concurrent first requests share one load.
+        // The towers are loaded separately (rather than as one
+        // zero-shot pipeline) so text embeddings can be cached.
+        const loading = Promise.all([
+            AutoTokenizer.from_pretrained(CLIP_MODEL_ID),
+            AutoProcessor.from_pretrained(CLIP_MODEL_ID),
+            CLIPTextModelWithProjection.from_pretrained(CLIP_MODEL_ID, options),
+            CLIPVisionModelWithProjection.from_pretrained(CLIP_MODEL_ID, options),
+        ]).then(([tokenizer, processor, textModel, visionModel]) => {
+            console.log(`✅ CLIP model [${version}] loaded`);
+            return { version, tokenizer, processor, textModel, visionModel };
+        });
+        loading.catch(() => clipModels.delete(version));
+        clipModels.set(version, loading);
     }
-    return clipModel;
+    return clipModels.get(version);
 }
 
 /**
@@ -65,7 +109,10 @@ app.get('/health', (req, res) => {
         status: 'ok', 
         service: 'Image Verification Service',
         models: {
-            clip: clipModel ? 'loaded' : 'not loaded',
+            clip: clipModels.size ? 'loaded' : 'not loaded',
+            clip_versions: [...clipModels.keys()],
+            clip_default_version: DEFAULT_CLIP_MODEL_VERSION,
+            clip_text_embeddings_cached: textEmbeddingCache.size,
             textClassifier: zeroShotClassifier ? 'loaded' : 'not loaded'
         }
     });
@@ -80,7 +127,8 @@ app.get('/health', (req, res) => {
  *   expected_brand: "DIBS Beauty",
  *   expected_product: "Lip Liner",
  *   expected_color: "#1 On the Rose",
- *   expected_size: "30ml"
+ *   expected_size: "30ml",
+ *   model_version: "quantized"   // optional: "quantized" | "fp32"
  * }
  */
 app.post('/verify-image', async (req, res) => {
@@ -90,7 +138,8 @@ app.post('/verify-image', async (req, res) => {
             expected_brand, 
             expected_product,
             expected_color,
-            expected_size 
+            expected_size,
+            model_version
         } = req.body;
 
         if (!image_url) {
@@ -102,7 +151,7 @@ app.post('/verify-image', async (req, res) => {
         if (expected_color) console.log(`   Color: ${expected_color}`);
         if (expected_size) console.log(`   Size: ${expected_size}`);
 
-        const model = await getClipModel();
+        const model = await getClipModel(model_version);
 
         // Build candidate descriptions
         const candidates = buildCandidateDescriptions(
@@ -115,7 +164,7 @@ app.post('/verify-image', async (req, res) => {
         console.log(`   Candidates: ${JSON.stringify(candidates)}`);
 
         // Run CLIP classification
-        const results = await model(image_url, candidates);
+        const [results] = await classifyImages(model, [image_url], candidates);
 
         console.log(`   Results:`, results);
 
@@ -138,30 +187,147 @@ app.post('/verify-image', async (req, res) => {
     }
 });
 
+/**
+ * Verify several images in one request
+ * 
+ * POST /verify-image-batch
+ * Body: {
+ *   items: [
+ *     { image_url, expected_brand, expected_product, expected_color, expected_size },
+ *     ...
+ *   ],
+ *   model_version: "quantized"   // optional
+ * }
+ * 
+ * All images go through the CLIP vision tower as one batch; each group of
+ * items sharing the same candidate descriptions is then scored against
+ * those (cached) text embeddings. Results come back in item order.
+ */
+app.post('/verify-image-batch', async (req, res) => {
+    try {
+        const { items, model_version } = req.body;
+
+        if (!Array.isArray(items) || items.length === 0) {
+            return res.status(400).json({ error: 'items must be a non-empty array' });
+        }
+
+        console.log(`\n🔍 Verifying batch of ${items.length} image(s)`);
+
+        const model = await getClipModel(model_version);
+        const results = new Array(items.length);
+
+        // Download/decode every image; a bad URL only fails its own item
+        const reads = await Promise.allSettled(
+            items.map(item => item.image_url
+                ? RawImage.read(item.image_url)
+                : Promise.reject(new Error('image_url is required')))
+        );
+        const loaded = [];
+        reads.forEach((read, index) => {
+            if (read.status === 'fulfilled') {
+                loaded.push(index);
+            } else {
+                results[index] = { success: false, detail: read.reason.message };
+            }
+        });
+
+        // One vision pass for the whole batch
+        const imageEmbeds = new Map(); // item index -> embedding
+        if (loaded.length) {
+            try {
+                const embeds = await embedImages(model, loaded.map(i => reads[i].value));
+                loaded.forEach((itemIndex, j) => imageEmbeds.set(itemIndex, embeds[j]));
+            } catch (error) {
+                console.error('❌ Error embedding image batch:', error);
+                for (const itemIndex of loaded) {
+                    results[itemIndex] = { success: false, detail: error.message };
+                }
+            }
+        }
+
+        // Group items by candidate descriptions so each group shares text embeddings
+        const groups = new Map();
+        for (const index of imageEmbeds.keys()) {
+            const item = items[index];
+            const candidates = buildCandidateDescriptions(
+                item.expected_brand,
+                item.expected_product,
+                item.expected_color,
+                item.expected_size
+            );
+            const key = JSON.stringify(candidates);
+            if (!groups.has(key)) {
+                groups.set(key, { candidates, indices: [] });
+            }
+            groups.get(key).indices.push(index);
+        }
+
+        for (const { candidates, indices } of groups.values()) {
+            try {
+                const textEmbeds = await getTextEmbeddings(model, candidates);
+
+                for (const itemIndex of indices) {
+                    const item = items[itemIndex];
+                    const scores = scoreImage(imageEmbeds.get(itemIndex), textEmbeds, candidates);
+                    results[itemIndex] = {
+                        success: true,
+                        image_url: item.image_url,
+                        verification: analyzeClipResults(
+                            scores,
+                            item.expected_brand,
+                            item.expected_product,
+                            item.expected_color
+                        ),
+                        raw_scores: scores
+                    };
+                }
+            } catch (error) {
+                console.error('❌ Error verifying image group:', error);
+                for (const itemIndex of indices) {
+                    results[itemIndex] = { success: false, detail: error.message };
+                }
+            }
+        }
+
+        res.json({ success: true, results });
+
+    } catch (error) {
+        console.error('❌ Error verifying image batch:', error);
+        res.status(500).json({ 
+            error: 'Failed to verify image batch',
+            detail: error.message 
+        });
+    }
+});
+
 /**
  * Compare two images for similarity (e.g., compare crawled image to reference)
  * 
  * POST /compare-images
  * Body: {
  *   image1_url: "https://...",
- *   image2_url: "https://..."
+ *   image2_url: "https://...",
+ *   model_version: "quantized"   // optional
  * }
  */
 app.post('/compare-images', async (req, res) => {
     try {
-        const { image1_url, image2_url } = req.body;
+        const { image1_url, image2_url, model_version } = req.body;
 
         if (!image1_url || !image2_url) {
             return res.status(400).json({ error: 'Both image URLs are required' });
         }
 
-        const model = await getClipModel();
+        const model = await getClipModel(model_version);
 
         // Use the same product description for both, check if they match similarly
         const testDescription = ['a beauty product', 'cosmetics', 'skincare product'];
         
-        const results1 = await model(image1_url, testDescription);
-        const results2 = await model(image2_url, testDescription);
+        const [results1, results2] = await classifyImages(
+            model,
+            [image1_url, image2_url],
+            testDescription
+        );
 
         // Calculate similarity based on distribution
         const similarity = calculateDistributionSimilarity(results1, results2);
@@ -243,7 +409,7 @@ app.post('/extract-attributes', async (req, res) => {
 app.post('/preload', async (req, res) => {
     try {
         console.log('⏳ Pre-loading models...');
-        await getClipModel();
+        await getClipModel(req.body?.model_version);
         await getTextClassifier();
         res.json({ success: true, message: 'Models pre-loaded' });
     } catch (error) {
@@ -251,8 +417,138 @@ app.post('/preload', async (req, res) => {
     }
 });
 
+/**
+ * Encode the CLIP text prompts for a product ahead of verification
+ * 
+ * POST /prewarm-text
+ * Body: {
+ *   expected_brand: "DIBS Beauty",
+ *   expected_product: "Lip Liner",
+ *   expected_color: "#1 On the Rose",   // optional
+ *   expected_size: "30ml",              // optional
+ *   model_version: "quantized"          // optional
+ * }
+ */
+app.post('/prewarm-text', async (req, res) => {
+    try {
+        const {
+            expected_brand,
+            expected_product,
+            expected_color,
+            expected_size,
+            model_version
+        } = req.body;
+
+        if (!expected_brand || !expected_product) {
+            return res.status(400).json({ error: 'expected_brand and expected_product are required' });
+        }
+
+        const model = await getClipModel(model_version);
+        const candidates = buildCandidateDescriptions(
+            expected_brand,
+            expected_product,
+            expected_color,
+            expected_size
+        );
+        await getTextEmbeddings(model, candidates);
+
+        res.json({ success: true, cached: textEmbeddingCache.size });
+    } catch (error) {
+        res.status(500).json({ error: 'Failed to prewarm text embeddings', detail: error.message });
+    }
+});
+
 // ============ Helper Functions ============
 
+/**
+ * L2-normalize each row of a [rows, dim] embedding tensor
+ */
+function unitRows(tensor) {
+    const [rows, dim] = tensor.dims;
+    const out = [];
+    for (let r = 0; r < rows; r++) {
+        const row = tensor.data.slice(r * dim, (r + 1) * dim);
+        let norm = 0;
+        for (let i = 0; i < dim; i++) norm += row[i] * row[i];
+        norm = Math.sqrt(norm) || 1;
+        for (let i = 0; i < dim; i++) row[i] /= norm;
+        out.push(row);
+    }
+    return out;
+}
+
+/**
+ * Unit-length text embeddings for the labels, encoding only cache misses
+ */
+async function getTextEmbeddings(clip, labels) {
+    const keyFor = label => `${clip.version}\u0000${label}`;
+    const fresh = new Map();
+
+    const missing = [...new Set(labels)].filter(label => !textEmbeddingCache.has(keyFor(label)));
+    if (missing.length) {
+        const textInputs = clip.tokenizer(
+            missing.map(label => CLIP_HYPOTHESIS_TEMPLATE.replace('{}', label)),
+            { padding: true, truncation: true }
+        );
+        const { text_embeds } = await clip.textModel(textInputs);
+        unitRows(text_embeds).forEach((embedding, i) => fresh.set(missing[i], embedding));
+    }
+
+    return labels.map(label => {
+        const key = keyFor(label);
+        const embedding = fresh.get(label) ?? textEmbeddingCache.get(key);
+        // Re-insert to mark as most recently used
+        textEmbeddingCache.delete(key);
+        textEmbeddingCache.set(key, embedding);
+        if (textEmbeddingCache.size > TEXT_EMBEDDING_CACHE_SIZE) {
+            textEmbeddingCache.delete(textEmbeddingCache.keys().next().value);
+        }
+        return embedding;
+    });
+}
+
+/**
+ * Zero-shot classify each image against the labels.
+ * 
+ * Returns, per image, [{ label, score }] sorted by score (highest first),
+ * the same shape the zero-shot-image-classification pipeline returns.
+ */
+async function classifyImages(clip, imageUrls, labels) {
+    const textEmbeds = await getTextEmbeddings(clip, labels);
+    const images = await Promise.all(imageUrls.map(url => RawImage.read(url)));
+    const imageEmbeds = await embedImages(clip, images);
+    return imageEmbeds.map(imageEmbed => scoreImage(imageEmbed, textEmbeds, labels));
+}
+
+/**
+ * Unit-length image embeddings, one vision-tower pass for all images
+ */
+async function embedImages(clip, images) {
+    const { pixel_values } = await clip.processor(images);
+    const { image_embeds } = await clip.visionModel({ pixel_values });
+    return unitRows(image_embeds);
+}
+
+/**
+ * Softmax-scored labels for one image embedding, highest first
+ */
+function scoreImage(imageEmbed, textEmbeds, labels) {
+    const logits = textEmbeds.map(textEmbed => {
+        let dot = 0;
+        for (let i = 0; i < imageEmbed.length; i++) dot += imageEmbed[i] * textEmbed[i];
+        return CLIP_LOGIT_SCALE * dot;
+    });
+
+    // Softmax over the candidate labels
+    const max = Math.max(...logits);
+    const exps = logits.map(logit => Math.exp(logit - max));
+    const sum = exps.reduce((a, b) => a + b, 0);
+
+    return labels
+        .map((label, i) => ({ score: exps[i] / sum, label }))
+        .sort((a, b) => b.score - a.score);
+}
+
 /**
  * Build candidate descriptions for CLIP classification
  */
@@ -362,8 +658,10 @@ Running on: http://localhost:${PORT}
 Endpoints:
   GET  /health           - Health check
   POST /verify-image     - Verify image matches product
+  POST /verify-image-batch - Verify several images in one call
   POST /compare-images   - Compare two images
   POST /extract-attributes - Extract product attributes from text
+  POST /prewarm-text     - Encode a product's CLIP text prompts
   POST /preload          - Pre-load models
 
 Note: First request will download models (~400MB).